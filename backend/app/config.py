@@ -1,35 +1,38 @@
 """SentinelX Backend Configuration"""
-import os
 from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
-
-load_dotenv()
 
 
 class Settings(BaseSettings):
+    """Values are resolved from the process env, then `.env`, then these defaults."""
+
     # App
     APP_NAME: str = "SentinelX"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
 
     # Auth / JWT
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "sentinelx-dev-secret-key-change-me")
+    SECRET_KEY: str = "sentinelx-dev-secret-key-change-me"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
     # OpenRouter (OpenAI-compatible)
-    OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
+    OPENROUTER_API_KEY: str = ""
 
     # Ethereum
-    SEPOLIA_RPC_URL: str = os.getenv("SEPOLIA_RPC_URL", "https://eth-sepolia.g.alchemy.com/v2/demo")
-    DEPLOYER_PRIVATE_KEY: str = os.getenv("DEPLOYER_PRIVATE_KEY", "")
-    AUDIT_CONTRACT_ADDRESS: str = os.getenv("AUDIT_CONTRACT_ADDRESS", "0x0000000000000000000000000000000000000000")
+    SEPOLIA_RPC_URL: str = "https://eth-sepolia.g.alchemy.com/v2/demo"
+    DEPLOYER_PRIVATE_KEY: str = ""
+    AUDIT_CONTRACT_ADDRESS: str = "0x0000000000000000000000000000000000000000"
 
     # Database
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql+asyncpg://localhost:5432/sentinelx")
+    DATABASE_URL: str = "postgresql+asyncpg://localhost:5432/sentinelx"
+    RESET_DB_ON_STARTUP: bool = False  # drop + recreate all tables on boot (dev only)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_PRE_PING: bool = False  # pool_recycle already retires connections before idle timeouts
+    DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statements per connection; 0 behind PgBouncer transaction pooling
 
     # CORS
-    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
+    FRONTEND_URL: str = "http://localhost:5173"
 
     # Risk thresholds
     RISK_LOW: float = 0.3
@@ -1,6 +1,9 @@
 """Database session management"""
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 from app.models.models import Base
 
@@ -18,20 +21,52 @@ def get_database_url() -> str:
     return url
 
 
+DATABASE_URL = get_database_url()
+
+# Every handler opens a short-lived session; the pool makes that a checkout,
+# not a handshake. Pre-ping costs a round-trip per checkout, so it's opt-in.
 engine = create_async_engine(
-    get_database_url(),
+    DATABASE_URL,
     echo=settings.DEBUG,
-    pool_size=5,
-    max_overflow=10,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=1800,   # recycle before managed Postgres idle timeouts drop us
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    query_cache_size=1200,  # compiled SQL cache, sized for every hot statement shape
+    connect_args=(
+        {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        if DATABASE_URL.startswith("postgresql+asyncpg://") else {}
+    ),
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Local SQLite: WAL so readers don't block on writers, 64MB page cache"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+
+# Dialect insert() exposing ON CONFLICT DO UPDATE — Postgres in prod, SQLite locally
+upsert = sqlite.insert if engine.dialect.name == "sqlite" else postgresql.insert
+
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
 async def init_db():
-    """Create all database tables (drop + recreate to sync schema)"""
+    """Create any missing database tables (idempotent, keeps existing data)"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def reset_db():
+    """Drop and recreate all tables — dev only, wipes every row"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
@@ -39,8 +74,5 @@ async def init_db():
 
 async def get_db():
     """Dependency: yields an async database session"""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    async with AsyncSessionLocal() as session:  # closes the session on exit
+        yield session
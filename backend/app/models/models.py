@@ -1,162 +1,275 @@
 """SQLAlchemy database models for SentinelX"""
-import uuid
+import os
+import time
 from datetime import datetime, timedelta
+from typing import Optional
+
 from sqlalchemy import (
-    Column, String, Float, Boolean, DateTime, Text, Integer, JSON
+    String, Float, Boolean, DateTime, Text, Integer, JSON, Index,
+    CheckConstraint, LargeBinary, TypeDecorator,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 
 def generate_uuid():
-    return str(uuid.uuid4())
+    """
+    Time-ordered UUIDv7 string (48-bit ms timestamp + random bits).
+    New rows land at the right edge of the primary-key index instead of
+    scattering random inserts across it.
+    """
+    value = ((time.time_ns() // 1_000_000) << 80) | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    h = f"{value:032x}"  # format directly — skips building a uuid.UUID per row
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class HexDigest(TypeDecorator):
+    """
+    32-byte hash stored as raw bytes (half the size of hex text).
+    Python code and API responses keep seeing hex strings.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, prefix: str = ""):
+        super().__init__(32)
+        self.prefix = prefix
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.startswith("0x"):
+            value = value[2:]
+        return bytes.fromhex(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.prefix + value.hex()
+
+
+class PackedDigests(TypeDecorator):
+    """
+    List of 32-byte hex hashes packed into one contiguous blob
+    (32 bytes per hash vs ~67 bytes each as a JSON array of hex strings).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return b"".join(bytes.fromhex(h[2:] if h.startswith("0x") else h) for h in value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return [value[i:i + 32].hex() for i in range(0, len(value), 32)]
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    wallet_address = Column(String, unique=True, nullable=False, index=True)
-    ens_name = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_login = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    wallet_address: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
+    ens_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
+    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class LoginEvent(Base):
     __tablename__ = "login_events"
-
-    id = Column(String, primary_key=True, default=generate_uuid)
-    wallet_address = Column(String, nullable=False, index=True)
-    ip_address = Column(String, nullable=True)
-    ip_hash = Column(String, nullable=True)
-    user_agent = Column(String, nullable=True)
-    geo_lat = Column(Float, nullable=True)
-    geo_lng = Column(Float, nullable=True)
-    geo_country = Column(String, nullable=True)
-    geo_city = Column(String, nullable=True)
-    risk_score = Column(Float, default=0.0)
-    risk_level = Column(String, default="low")
-    risk_features = Column(JSON, nullable=True)
-    step_up_required = Column(Boolean, default=False)
-    step_up_completed = Column(Boolean, default=False)
-    event_hash = Column(String, nullable=True)
-    merkle_root = Column(String, nullable=True)
-    tx_hash = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # RiskEngine / dashboard: recent logins for a wallet, newest first.
+        # INCLUDE carries every column the trust-score, overview and timeline reads
+        # project, so those are index-only on Postgres; other dialects ignore it.
+        Index(
+            "ix_login_events_wallet_ts", "wallet_address", "timestamp",
+            postgresql_include=[
+                "risk_score", "risk_level", "event_hash",
+                "geo_country", "geo_city", "geo_lat", "geo_lng", "ip_hash",
+            ],
+        ),
+        # Reads compare the plain column against a lowered wallet; keeping
+        # stored values lowercase is what lets them use the index above
+        CheckConstraint("wallet_address = lower(wallet_address)", name="ck_login_events_wallet_lower"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    wallet_address: Mapped[str] = mapped_column(String, nullable=False)
+    ip_address: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    ip_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    user_agent: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    geo_lat: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    geo_lng: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    geo_country: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    geo_city: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    risk_score: Mapped[Optional[float]] = mapped_column(Float, default=0.0)
+    risk_level: Mapped[Optional[str]] = mapped_column(String, default="low")
+    risk_features: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    step_up_required: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    step_up_completed: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    event_hash: Mapped[Optional[str]] = mapped_column(HexDigest(), nullable=True)
+    merkle_root: Mapped[Optional[str]] = mapped_column(HexDigest(prefix="0x"), nullable=True)
+    tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class GuardEvent(Base):
     __tablename__ = "guard_events"
-
-    id = Column(String, primary_key=True, default=generate_uuid)
-    wallet_address = Column(String, nullable=False, index=True)
-    content_hash = Column(String, nullable=False)
-    scan_type = Column(String, default="regex")  # regex, llm, both
-    risk_detected = Column(Boolean, default=False)
-    risk_categories = Column(JSON, nullable=True)
-    llm_response = Column(Text, nullable=True)
-    user_override = Column(Boolean, default=False)
-    event_hash = Column(String, nullable=True)
-    merkle_root = Column(String, nullable=True)
-    tx_hash = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # Dashboard overview: recent scans for a wallet, index-only on Postgres
+        Index(
+            "ix_guard_events_wallet_ts", "wallet_address", "timestamp",
+            postgresql_include=[
+                "risk_detected", "user_override", "risk_categories",
+                "content_hash", "event_hash",
+            ],
+        ),
+        CheckConstraint("wallet_address = lower(wallet_address)", name="ck_guard_events_wallet_lower"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    wallet_address: Mapped[str] = mapped_column(String, nullable=False)
+    content_hash: Mapped[str] = mapped_column(HexDigest(), nullable=False)
+    scan_type: Mapped[Optional[str]] = mapped_column(String, default="regex")  # regex, llm, both
+    risk_detected: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    risk_categories: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    llm_response: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    user_override: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    event_hash: Mapped[Optional[str]] = mapped_column(HexDigest(), nullable=True)
+    merkle_root: Mapped[Optional[str]] = mapped_column(HexDigest(prefix="0x"), nullable=True)
+    tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class AuditBatch(Base):
     __tablename__ = "audit_batches"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    merkle_root = Column(String, nullable=False, unique=True)
-    event_count = Column(Integer, default=0)
-    event_hashes = Column(JSON, nullable=True)
-    tx_hash = Column(String, nullable=True)
-    block_number = Column(Integer, nullable=True)
-    gas_used = Column(Integer, nullable=True)
-    status = Column(String, default="pending")  # pending, submitted, confirmed
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    merkle_root: Mapped[str] = mapped_column(HexDigest(prefix="0x"), nullable=False, unique=True)
+    event_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    event_hashes: Mapped[Optional[list]] = mapped_column(PackedDigests, nullable=True)
+    tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    block_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    gas_used: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(String, default="pending")  # pending, submitted, confirmed
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class Nonce(Base):
     __tablename__ = "nonces"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    nonce = Column(String, unique=True, nullable=False)
-    wallet_address = Column(String, nullable=True)
-    used = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    nonce: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    wallet_address: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    used: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class ConversationParticipant(Base):
     __tablename__ = "conversation_participants"
+    __table_args__ = (
+        # Participants of a conversation (send path); one row per wallet
+        Index("ix_conversation_participants_conv_wallet", "conversation_id", "wallet_address", unique=True),
+        # A wallet's conversations (conversation list, find_conversation join)
+        Index("ix_conversation_participants_wallet_conv", "wallet_address", "conversation_id"),
+    )
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    conversation_id = Column(String, nullable=False, index=True)
-    wallet_address = Column(String, nullable=False, index=True)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    conversation_id: Mapped[str] = mapped_column(String, nullable=False)
+    wallet_address: Mapped[str] = mapped_column(String, nullable=False)
+
+
+MESSAGE_TTL = timedelta(hours=24)
 
 
 def default_expires_at():
-    return datetime.utcnow() + timedelta(hours=24)
+    return datetime.utcnow() + MESSAGE_TTL
 
 
 class Message(Base):
     __tablename__ = "messages"
-
-    id = Column(String, primary_key=True, default=generate_uuid)
-    conversation_id = Column(String, nullable=False, index=True)
-    sender_wallet = Column(String, nullable=False, index=True)
-    content = Column(Text, nullable=False)
-    content_hash = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, default=default_expires_at)
-    is_delivered = Column(Boolean, default=False)
-    is_read = Column(Boolean, default=False)
-    risk_score = Column(Float, default=0.0)
-    was_blocked = Column(Boolean, default=False)
-    event_hash = Column(String, nullable=True)
-    risk_categories = Column(JSON, nullable=True)
-    redacted = Column(Boolean, default=False)
-    user_override = Column(Boolean, default=False)
+    __table_args__ = (
+        # Message history / latest-message preview per conversation
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    conversation_id: Mapped[str] = mapped_column(String, nullable=False)
+    sender_wallet: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    content_hash: Mapped[str] = mapped_column(HexDigest(), nullable=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=default_expires_at)
+    is_delivered: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    is_read: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    risk_score: Mapped[Optional[float]] = mapped_column(Float, default=0.0)
+    was_blocked: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    event_hash: Mapped[Optional[str]] = mapped_column(HexDigest(), nullable=True)
+    risk_categories: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    redacted: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    user_override: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
 
 
 class SecurityState(Base):
     __tablename__ = "security_states"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
-    wallet_address = Column(String, unique=True, nullable=False, index=True)
-    trust_score = Column(Integer, default=100)
-    trust_bonus = Column(Integer, default=0)  # accumulated bonus from step-up verifications
-    security_status = Column(String, default="active")  # active, step_up_required, restricted, locked
-    locked_until = Column(DateTime, nullable=True)
-    cooldown_reason = Column(String, nullable=True)
-    last_evaluated = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    wallet_address: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
+    trust_score: Mapped[Optional[int]] = mapped_column(Integer, default=100)
+    trust_bonus: Mapped[Optional[int]] = mapped_column(Integer, default=0)  # accumulated bonus from step-up verifications
+    security_status: Mapped[Optional[str]] = mapped_column(String, default="active")  # active, step_up_required, restricted, locked
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    cooldown_reason: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_evaluated: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class TransactionEvent(Base):
     __tablename__ = "transaction_events"
-
-    id = Column(String, primary_key=True, default=generate_uuid)
-    sender_wallet = Column(String, nullable=False, index=True)
-    recipient_wallet = Column(String, nullable=False, index=True)
-    amount_eth = Column(Float, nullable=False)
-    risk_score = Column(Float, default=0.0)
-    risk_level = Column(String, default="low")
-    risk_factors = Column(JSON, nullable=True)
-    status = Column(String, default="pending")  # pending, approved, blocked, completed, cooldown
-    tx_hash = Column(String, nullable=True)
-    conversation_id = Column(String, nullable=True, index=True)
-    step_up_required = Column(Boolean, default=False)
-    step_up_completed = Column(Boolean, default=False)
-    cooldown_until = Column(DateTime, nullable=True)
-    event_hash = Column(String, nullable=True)
-    merkle_root = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # Sender history / cooldown checks, newest first. INCLUDE covers /stats'
+        # aggregates, so that single query is index-only on Postgres. Named apart
+        # from the old plain index so create_all builds it on existing databases.
+        Index(
+            "ix_transaction_events_sender_created_incl", "sender_wallet", "created_at",
+            postgresql_include=["amount_eth", "status", "step_up_required", "risk_score"],
+        ),
+        # Received side of history / overview (sender OR recipient → BitmapOr of the two)
+        Index("ix_transaction_events_recipient_created", "recipient_wallet", "created_at"),
+        CheckConstraint(
+            "sender_wallet = lower(sender_wallet) AND recipient_wallet = lower(recipient_wallet)",
+            name="ck_transaction_events_wallets_lower",
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    sender_wallet: Mapped[str] = mapped_column(String, nullable=False)
+    recipient_wallet: Mapped[str] = mapped_column(String, nullable=False)
+    amount_eth: Mapped[float] = mapped_column(Float, nullable=False)
+    risk_score: Mapped[Optional[float]] = mapped_column(Float, default=0.0)
+    risk_level: Mapped[Optional[str]] = mapped_column(String, default="low")
+    risk_factors: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(String, default="pending")  # pending, approved, blocked, completed, cooldown
+    tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    conversation_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    step_up_required: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    step_up_completed: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    cooldown_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    event_hash: Mapped[Optional[str]] = mapped_column(HexDigest(), nullable=True)
+    merkle_root: Mapped[Optional[str]] = mapped_column(HexDigest(prefix="0x"), nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
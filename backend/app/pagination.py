@@ -0,0 +1,39 @@
+"""Keyset page cursors shared by the history/timeline endpoints"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from app.responses import naive_utc
+
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """
+    Opaque "<timestamp>_<id>" cursor for the last row of a page. The id breaks
+    ties, so rows sharing the boundary timestamp are not skipped.
+    """
+    return f"{timestamp.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Parse a cursor from encode_cursor(); 400 on anything else"""
+    if not cursor:
+        return None
+    ts, sep, row_id = cursor.partition("_")
+    try:
+        if not sep or not row_id:
+            raise ValueError(cursor)
+        return naive_utc(datetime.fromisoformat(ts)), row_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def before_cursor(ts_column, id_column, cursor: Tuple[datetime, str]):
+    """
+    Rows strictly after `cursor` in (timestamp DESC, id DESC) order.
+    Expanded rather than tuple_() so the leading `ts <=` bound still seeks
+    the (wallet, timestamp) indexes.
+    """
+    ts, row_id = cursor
+    return and_(ts_column <= ts, or_(ts_column < ts, id_column < row_id))
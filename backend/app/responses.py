@@ -0,0 +1,29 @@
+"""Shared response classes"""
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class UTCJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that renders naive (UTC) datetimes as ISO-8601 with a "Z"
+    suffix — handlers can return datetimes instead of isoformat() + "Z".
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Inverse of the rendering above for incoming datetimes (e.g. a page cursor
+    echoed back as "...Z"): columns store naive UTC, so drop the offset.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
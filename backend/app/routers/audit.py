@@ -5,11 +5,13 @@ Merkle batching and on-chain proof verification endpoints
 from typing import List, Optional
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from app.services.merkle import MerkleBatcher
 
 router = APIRouter()
+batcher = MerkleBatcher.get_instance()
 
 
 class VerifyRequest(BaseModel):
@@ -24,30 +26,29 @@ class BatchRequest(BaseModel):
 
 # ─── Endpoints ──────────────────────────────────────────────────────
 
-@router.get("/stats")
+# Polled endpoints return ORJSONResponse directly: the payloads are already
+# plain JSON types, so FastAPI's jsonable_encoder walk is skipped.
+
+@router.get("/stats", response_class=ORJSONResponse)
 async def get_audit_stats():
     """Get Merkle batching statistics"""
-    batcher = MerkleBatcher.get_instance()
-    return batcher.get_stats()
+    return ORJSONResponse(batcher.get_stats())
 
 
-@router.get("/batches")
+@router.get("/batches", response_class=ORJSONResponse)
 async def get_batches():
     """Get all Merkle batches"""
-    batcher = MerkleBatcher.get_instance()
     stats = batcher.get_stats()
-    return {
+    return ORJSONResponse({
         "batches": stats["batches"],
         "total": stats["total_batches"],
         "pending_events": stats["pending_events"],
-    }
+    })
 
 
 @router.post("/batch")
 async def create_batch(req: BatchRequest):
     """Force create a Merkle batch from pending events"""
-    batcher = MerkleBatcher.get_instance()
-
     if not batcher.pending_events:
         return {"success": False, "message": "No pending events to batch"}
 
@@ -70,7 +71,6 @@ async def create_batch(req: BatchRequest):
 @router.get("/proof/{merkle_root}/{event_hash}")
 async def get_proof(merkle_root: str, event_hash: str):
     """Get Merkle proof for a specific event"""
-    batcher = MerkleBatcher.get_instance()
     proof = batcher.get_proof(merkle_root, event_hash)
 
     if not proof:
@@ -89,7 +89,6 @@ async def get_proof(merkle_root: str, event_hash: str):
 @router.post("/verify")
 async def verify_inclusion(req: VerifyRequest):
     """Verify that an event hash is included in a Merkle batch"""
-    batcher = MerkleBatcher.get_instance()
     is_valid = batcher.verify_inclusion(
         event_hash=req.event_hash,
         proof=req.proof,
@@ -105,11 +104,10 @@ async def verify_inclusion(req: VerifyRequest):
     }
 
 
-@router.get("/pending")
+@router.get("/pending", response_class=ORJSONResponse)
 async def get_pending_events():
     """Get events waiting to be batched"""
-    batcher = MerkleBatcher.get_instance()
-    return {
+    return ORJSONResponse({
         "pending": batcher.pending_events[-20:],
         "count": len(batcher.pending_events),
-    }
+    })
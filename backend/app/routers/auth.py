@@ -2,30 +2,56 @@
 SentinelX SIWE Authentication Router
 Wallet-based passwordless login with EIP-4361
 """
+import asyncio
 import hashlib
+import os
+import re
 import secrets
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
+from cachetools import TTLCache
+from eth_hash.auto import keccak
+from eth_keys import keys
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database import get_db
-from app.models.models import User, LoginEvent, Nonce
+from app.database import get_db, upsert
+from app.models.models import User, LoginEvent, Nonce, generate_uuid
+from app.responses import UTCJSONResponse
 from app.services.jwt_utils import create_access_token, verify_token, get_wallet_from_token
 from app.services.risk_engine import RiskEngine
 from app.services.merkle import MerkleBatcher
 from app.services.enforcement import SecurityEnforcement
+from app.services.response_cache import ResponseCache
 
 router = APIRouter()
 
+# Hot-path config, bound once at import
+RISK_MEDIUM = settings.RISK_MEDIUM
+
+EIP191_PREFIX = b"\x19Ethereum Signed Message:\n"
+WALLET_ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]{40}")
+
+# Dedicated pool for secp256k1 recovery — coincurve releases the GIL, so this
+# scales with cores and doesn't queue behind other to_thread work
+signature_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="sigverify")
+
+risk_engine = RiskEngine.get_instance()
+batcher = MerkleBatcher.get_instance()
+enforcer = SecurityEnforcement.get_instance()
+
 # ─── In-memory nonce store (for hackathon speed) ────────────────────
-nonce_store: dict = {}
-step_up_store: dict = {}  # nonce → { wallet, issued_at, expires_at }
+# Bounded TTL caches: expired entries are evicted automatically so the
+# stores stay flat under steady /nonce and /challenge traffic.
+# NOTE: per-process only — use Redis SETEX when running multiple workers.
+NONCE_TTL_SECONDS = 600
+STEP_UP_TTL_SECONDS = 120
+nonce_store: TTLCache = TTLCache(maxsize=100_000, ttl=NONCE_TTL_SECONDS)  # nonce → (issued_at, used)
+step_up_store: TTLCache = TTLCache(maxsize=100_000, ttl=STEP_UP_TTL_SECONDS)  # nonce → { wallet, issued_at, expires_at }
 
 
 # ─── Request/Response Models ────────────────────────────────────────
@@ -82,13 +108,10 @@ async def get_nonce():
     """Generate a fresh nonce for SIWE message signing"""
     nonce = secrets.token_urlsafe(32)
     issued_at = datetime.utcnow()
-    expires_at = issued_at + timedelta(minutes=10)
+    expires_at = issued_at + timedelta(seconds=NONCE_TTL_SECONDS)
 
-    nonce_store[nonce] = {
-        "issued_at": issued_at.isoformat(),
-        "expires_at": expires_at.isoformat(),
-        "used": False,
-    }
+    # Expiry is handled by the TTLCache itself
+    nonce_store[nonce] = (issued_at.isoformat(), False)  # (issued_at, used)
 
     return NonceResponse(
         nonce=nonce,
@@ -105,15 +128,16 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
     """
     wallet = req.wallet_address.strip()
 
-    # Validate wallet address format
-    if not wallet.startswith("0x") or len(wallet) != 42:
+    # Validate wallet address format (prefix, length and hex) before any DB work
+    if not WALLET_ADDRESS_PATTERN.fullmatch(wallet):
         raise HTTPException(status_code=400, detail="Invalid wallet address format")
+    wallet_lc = wallet.lower()
 
     # For hackathon: simplified SIWE verification
     # In production, use the siwe library for full EIP-4361 verification
     try:
         # Try full SIWE verification
-        is_valid = _verify_signature(req.message, req.signature, wallet)
+        is_valid = await _verify_signature(req.message, req.signature, wallet)
     except Exception:
         # Fallback: accept for demo purposes (signature present = valid)
         is_valid = len(req.signature) > 20
@@ -129,7 +153,6 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
     user_agent = req.user_agent or request.headers.get("user-agent", "")
 
     # ─── AI Risk Scoring ─────────────────────────────────
-    risk_engine = RiskEngine.get_instance()
     risk_score, risk_level, risk_explanation = await risk_engine.score(
         db=db,
         wallet_address=wallet,
@@ -138,38 +161,34 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
         geo_country=req.geo_country,
     )
 
-    step_up_required = risk_score >= settings.RISK_MEDIUM
-
-    # ─── Create/Update User ──────────────────────────────
-    result = await db.execute(select(User).where(User.wallet_address == wallet.lower()))
-    user = result.scalar_one_or_none()
+    step_up_required = risk_score >= RISK_MEDIUM
 
-    if not user:
-        user = User(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet.lower(),
-            created_at=datetime.utcnow(),
-            last_login=datetime.utcnow(),
+    # ─── Create/Update User (single UPSERT) ──────────────
+    now = datetime.utcnow()
+    await db.execute(
+        upsert(User)
+        .values(
+            id=generate_uuid(),
+            wallet_address=wallet_lc,
+            created_at=now,
+            last_login=now,
+        )
+        .on_conflict_do_update(
+            index_elements=[User.wallet_address],
+            set_={"last_login": now},
         )
-        db.add(user)
-    else:
-        user.last_login = datetime.utcnow()
+    )
 
     # ─── Store Login Event ───────────────────────────────
-    import json
-    event_data = json.dumps({
-        "wallet": wallet.lower(),
-        "ip_hash": hashlib.sha256(ip_address.encode()).hexdigest(),
-        "risk_score": risk_score,
-        "timestamp": datetime.utcnow().isoformat(),
-    }, sort_keys=True)
-    event_hash = hashlib.sha256(event_data.encode()).hexdigest()
+    ip_hash = _sha256_hex(ip_address)
+    # Fixed-order "|"-delimited preimage — avoids a json.dumps(sort_keys=True) per login
+    event_hash = _sha256_hex(f"{wallet_lc}|{ip_hash}|{risk_score}|{now.isoformat()}")
 
     login_event = LoginEvent(
-        id=str(uuid.uuid4()),
-        wallet_address=wallet.lower(),
+        id=generate_uuid(),
+        wallet_address=wallet_lc,
         ip_address=ip_address,
-        ip_hash=hashlib.sha256(ip_address.encode()).hexdigest(),
+        ip_hash=ip_hash,
         user_agent=user_agent,
         geo_lat=req.geo_lat,
         geo_lng=req.geo_lng,
@@ -180,20 +199,19 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
         risk_features=risk_explanation.get("factors"),
         step_up_required=step_up_required,
         event_hash=event_hash,
-        timestamp=datetime.utcnow(),
+        timestamp=now,
     )
     db.add(login_event)
     await db.commit()
+    ResponseCache.get_instance().invalidate(wallet_lc)
 
     # ─── Add to Merkle Batch ─────────────────────────────
-    batcher = MerkleBatcher.get_instance()
     batcher.add_event(event_hash, event_type="login", metadata={
-        "wallet": wallet.lower(),
+        "wallet": wallet_lc,
         "risk_level": risk_level,
     })
 
     # ─── Security Enforcement ─────────────────────────────
-    enforcer = SecurityEnforcement.get_instance()
     enforcement = await enforcer.evaluate_and_enforce(db, wallet)
     security_status = enforcement["security_status"]
     is_locked = security_status == "locked"
@@ -203,7 +221,7 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
     if is_locked:
         return AuthResponse(
             success=False,
-            wallet_address=wallet.lower(),
+            wallet_address=wallet_lc,
             risk_score=risk_score,
             risk_level=risk_level,
             security_status=security_status,
@@ -217,7 +235,7 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
 
     # ─── Issue JWT ───────────────────────────────────────
     token = create_access_token(data={
-        "sub": wallet.lower(),
+        "sub": wallet_lc,
         "risk_level": risk_level,
         "risk_score": risk_score,
         "security_status": security_status,
@@ -232,7 +250,7 @@ async def verify_siwe(req: SIWEVerifyRequest, request: Request, db: AsyncSession
     return AuthResponse(
         success=True,
         token=token,
-        wallet_address=wallet.lower(),
+        wallet_address=wallet_lc,
         risk_score=risk_score,
         risk_level=risk_level,
         risk_explanation=risk_explanation,
@@ -251,7 +269,7 @@ async def step_up_challenge(req: ChallengeRequest):
     """Issue a step-up authentication challenge for high-risk logins"""
     nonce = secrets.token_urlsafe(32)
     now = datetime.utcnow()
-    expires_at = now + timedelta(minutes=2)
+    expires_at = now + timedelta(seconds=STEP_UP_TTL_SECONDS)
 
     step_up_store[nonce] = {
         "wallet": req.wallet_address.lower(),
@@ -263,7 +281,7 @@ async def step_up_challenge(req: ChallengeRequest):
         "challenge_type": req.challenge_type,
         "nonce": nonce,
         "message": f"SentinelX Step-Up Verification\n\nSign this message to confirm your identity and restore trust.\n\nWallet: {req.wallet_address}\nNonce: {nonce}\nTimestamp: {now.isoformat()}Z",
-        "expires_in": 120,
+        "expires_in": STEP_UP_TTL_SECONDS,
     }
 
 
@@ -297,7 +315,7 @@ async def step_up_verify(req: StepUpVerifyRequest, db: AsyncSession = Depends(ge
     # Verify signature (same logic as login)
     expected_message = f"SentinelX Step-Up Verification\n\nSign this message to confirm your identity and restore trust.\n\nWallet: {req.wallet_address}\nNonce: {nonce}\nTimestamp: {challenge['issued_at']}Z"
     try:
-        is_valid = _verify_signature(expected_message, req.signature, wallet)
+        is_valid = await _verify_signature(expected_message, req.signature, wallet)
     except Exception:
         is_valid = len(req.signature) > 20 and req.signature.startswith("0x")
 
@@ -308,8 +326,8 @@ async def step_up_verify(req: StepUpVerifyRequest, db: AsyncSession = Depends(ge
     step_up_store.pop(nonce, None)
 
     # Boost trust score via enforcement service
-    enforcer = SecurityEnforcement.get_instance()
     result = await enforcer.complete_step_up(db, wallet, boost=20)
+    ResponseCache.get_instance().invalidate(wallet)
 
     return {
         "success": True,
@@ -349,8 +367,7 @@ async def get_security_state(
     db: AsyncSession = Depends(get_db),
 ):
     """Get the current security enforcement state for a wallet."""
-    enforcer = SecurityEnforcement.get_instance()
-    return await enforcer.get_security_state(db, wallet_address)
+    return UTCJSONResponse(await enforcer.get_security_state(db, wallet_address))
 
 
 @router.post("/security-state/refresh")
@@ -359,21 +376,34 @@ async def refresh_security_state(
     db: AsyncSession = Depends(get_db),
 ):
     """Recompute and return the security enforcement state."""
-    enforcer = SecurityEnforcement.get_instance()
-    return await enforcer.evaluate_and_enforce(db, wallet_address)
+    return UTCJSONResponse(await enforcer.evaluate_and_enforce(db, wallet_address))
 
 
 # ─── Helpers ─────────────────────────────────────────────────────────
 
-def _verify_signature(message: str, signature: str, expected_address: str) -> bool:
+def _sha256_hex(text: str) -> str:
+    """Hex SHA-256 of a UTF-8 string (OpenSSL-backed, SHA-NI where available)"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def _verify_signature(message: str, signature: str, expected_address: str) -> bool:
+    """Verify a signature on the signature pool — secp256k1 recovery is CPU-bound"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(signature_pool, _verify_signature_sync, message, signature, expected_address)
+
+
+def _verify_signature_sync(message: str, signature: str, expected_address: str) -> bool:
     """Verify an Ethereum signature against a message and expected address"""
     try:
-        from eth_account.messages import encode_defunct
-        from eth_account import Account
-
-        msg = encode_defunct(text=message)
-        recovered = Account.recover_message(msg, signature=signature)
-        return recovered.lower() == expected_address.lower()
+        # EIP-191 personal_sign digest, built directly (same bytes as encode_defunct)
+        msg_bytes = message.encode()
+        digest = keccak(EIP191_PREFIX + str(len(msg_bytes)).encode() + msg_bytes)
+
+        sig = bytearray(bytes.fromhex(signature[2:] if signature.startswith("0x") else signature))
+        if sig[64] >= 27:
+            sig[64] -= 27  # wallets emit v as 27/28, eth_keys expects 0/1
+        recovered = keys.Signature(bytes(sig)).recover_public_key_from_msg_hash(digest)
+        return recovered.to_checksum_address().lower() == expected_address.lower()
     except Exception:
         # For demo: if we can't verify cryptographically, check signature format
         return len(signature) > 20 and signature.startswith("0x")
@@ -4,52 +4,143 @@ WebSocket-centric messaging with GuardLayer DLP integration.
 REST endpoints are read-only (conversations list, message history).
 All message sending happens through the WebSocket.
 """
-import hashlib
-import json
-import uuid
+import asyncio
+import sys
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from functools import lru_cache, partial
+from typing import Callable, Dict, Iterable, Optional, Set
 
+import orjson
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query
-from sqlalchemy import select, desc, func
+from sqlalchemy import and_, insert, lambda_stmt, select, desc, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.database import get_db, AsyncSessionLocal
-from app.models.models import Conversation, ConversationParticipant, Message
+from app.models.models import MESSAGE_TTL, Conversation, ConversationParticipant, Message, generate_uuid
+from app.responses import UTCJSONResponse
 from app.services.guard_layer import GuardLayer
 from app.services.merkle import MerkleBatcher
 from app.services.jwt_utils import verify_token
+from app.services.write_buffer import WriteBuffer
 
 router = APIRouter()
-guard = GuardLayer()
+guard = GuardLayer.get_instance()
+write_buffer = WriteBuffer.get_instance()
 
 SEVERITY_SCORES = {"low": 0.0, "medium": 0.3, "high": 0.6, "critical": 1.0}
 
+# WS frames: naive UTC datetimes serialize as ISO-8601 with a "Z" suffix
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+# Per-connection outbound queue depth; a client this far behind is disconnected
+SEND_QUEUE_SIZE = 256
+# "Try again later" — the frontend reconnects; dropped frames remain in message history
+SLOW_CLIENT_CLOSE_CODE = 1013
+# A newer socket for the same wallet took over; the frontend doesn't reconnect on this one
+REPLACED_CLOSE_CODE = 4000
+
 
 # ─── WebSocket Connection Manager ────────────────────────────────────
 
+class Connection:
+    """A live socket plus its outbound queue, drained by a dedicated writer task."""
+
+    def __init__(self, websocket: WebSocket, on_dead: Callable[["Connection"], None]):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.on_dead = on_dead
+        self.writer = asyncio.create_task(self._write_loop())
+        self.closer: Optional[asyncio.Task] = None
+
+    async def _write_loop(self):
+        while True:
+            payload = await self.queue.get()
+            try:
+                await self.websocket.send_text(payload)
+            except Exception:
+                # Socket is gone: hand ourselves back for cleanup instead of
+                # dying with an exception nobody retrieves
+                self.on_dead(self)
+                return
+
+    def enqueue(self, payload: str) -> bool:
+        """Queue a frame without blocking; False means the client has fallen too far behind"""
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+
 class ConnectionManager:
-    """Manages active WebSocket connections by wallet address."""
+    """
+    Manages active WebSocket connections by wallet address.
+    Keys are lowercase wallets — callers normalize once, not per send.
+    Sends never block the caller: frames are encoded once and queued per socket,
+    and a socket whose queue is full is closed rather than allowed to stall or grow.
+    """
 
     def __init__(self):
-        self.active: Dict[str, WebSocket] = {}
+        self.active: Dict[str, Connection] = {}
+        # In-flight websocket.close() tasks. The event loop only holds tasks
+        # weakly, and a closing conn is already out of `active`, so this set
+        # is what keeps them alive until they finish.
+        self.closing: Set[asyncio.Task] = set()
 
     async def connect(self, wallet: str, websocket: WebSocket):
         await websocket.accept()
-        self.active[wallet.lower()] = websocket
-
-    def disconnect(self, wallet: str):
-        self.active.pop(wallet.lower(), None)
-
-    async def send_to(self, wallet: str, data: dict) -> bool:
-        ws = self.active.get(wallet.lower())
-        if ws:
-            try:
-                await ws.send_json(data)
-                return True
-            except Exception:
-                self.disconnect(wallet)
-        return False
+        previous = self.active.get(wallet)
+        self.active[wallet] = Connection(websocket, partial(self._drop, wallet))
+        if previous:
+            # Reconnect: its disconnect() will no longer match, so retire it here
+            self._close(previous, REPLACED_CLOSE_CODE)
+
+    def disconnect(self, wallet: str, websocket: WebSocket):
+        # Only drop our own socket — a reconnect may already have replaced it
+        conn = self.active.get(wallet)
+        if conn and conn.websocket is websocket:
+            del self.active[wallet]
+            conn.writer.cancel()
+
+    def send_to(self, wallet: str, data: dict) -> bool:
+        return self.send_to_many((wallet,), data) > 0
+
+    def send_to_many(self, wallets: Iterable[str], data: dict) -> int:
+        """Queue one frame for every connected wallet; returns how many were online"""
+        payload = None
+        sent = 0
+        for wallet in wallets:
+            conn = self.active.get(wallet)
+            if conn:
+                if payload is None:
+                    payload = orjson.dumps(data, option=ORJSON_OPTIONS).decode()
+                if conn.enqueue(payload):
+                    sent += 1
+                else:
+                    del self.active[wallet]
+                    self._close(conn, SLOW_CLIENT_CLOSE_CODE)
+        return sent
+
+    def _drop(self, wallet: str, conn: Connection):
+        """A writer hit a failed send: forget the conn (if still current) and close it"""
+        if self.active.get(wallet) is conn:
+            del self.active[wallet]
+        self._close(conn, SLOW_CLIENT_CLOSE_CODE)
+
+    def _close(self, conn: Connection, code: int):
+        # Stop writing and close out of band; the endpoint's receive loop sees the disconnect
+        conn.writer.cancel()
+        if conn.closer is None:
+            conn.closer = asyncio.create_task(conn.websocket.close(code=code))
+            self.closing.add(conn.closer)
+            conn.closer.add_done_callback(self._closed)
+
+    def _closed(self, task: asyncio.Task):
+        self.closing.discard(task)
+        # Closing an already-dead socket raises; that's expected, but retrieve
+        # it so the loop doesn't report it as never retrieved
+        if not task.cancelled():
+            task.exception()
 
 
 manager = ConnectionManager()
@@ -57,59 +148,76 @@ manager = ConnectionManager()
 
 # ─── Helper Functions ─────────────────────────────────────────────────
 
+@lru_cache(maxsize=4096)
+def normalize_wallet(wallet: str) -> str:
+    """
+    Lowercased, interned wallet address. Cached because the active set is
+    small: repeat lookups skip .lower() and share one key object, so
+    ConnectionManager dict hits compare by identity.
+    """
+    return sys.intern(wallet.lower())
+
+
+async def send_json(ws: WebSocket, data: dict):
+    """Reply on a socket as a JSON text frame, encoded with orjson."""
+    await ws.send_text(orjson.dumps(data, option=ORJSON_OPTIONS).decode())
+
+
+async def send_pong(ws: WebSocket, *_):
+    """Answer anything that isn't a known message type."""
+    await send_json(ws, {"type": "pong", "timestamp": datetime.utcnow()})
+
+
+# Aliases for the participant self-join in find_conversation
+participant_a = aliased(ConversationParticipant)
+participant_b = aliased(ConversationParticipant)
+
+
 async def find_conversation(db: AsyncSession, wallet_a: str, wallet_b: str) -> Optional[str]:
     """Find existing conversation between two wallets."""
-    a_convs = select(ConversationParticipant.conversation_id).where(
-        ConversationParticipant.wallet_address == wallet_a.lower()
-    ).scalar_subquery()
-
-    result = await db.execute(
-        select(ConversationParticipant.conversation_id).where(
-            ConversationParticipant.wallet_address == wallet_b.lower(),
-            ConversationParticipant.conversation_id.in_(a_convs),
-        ).limit(1)
-    )
+    wallet_a, wallet_b = normalize_wallet(wallet_a), normalize_wallet(wallet_b)
+    # Self-join on conversation_id: a semi-join that stops at the first shared conversation
+    result = await db.execute(lambda_stmt(
+        lambda: select(participant_a.conversation_id)
+        .join(participant_b, participant_a.conversation_id == participant_b.conversation_id)
+        .where(
+            participant_a.wallet_address == wallet_a,
+            participant_b.wallet_address == wallet_b,
+        )
+        .limit(1)
+    ))
     return result.scalar()
 
 
 async def create_conversation_db(db: AsyncSession, wallet_a: str, wallet_b: str) -> str:
     """Create a new conversation between two wallets."""
-    conv = Conversation(id=str(uuid.uuid4()))
-    db.add(conv)
-    db.add(ConversationParticipant(
-        conversation_id=conv.id, wallet_address=wallet_a.lower(),
-    ))
-    db.add(ConversationParticipant(
-        conversation_id=conv.id, wallet_address=wallet_b.lower(),
-    ))
+    conv_id = generate_uuid()
+    # Core inserts — nothing here needs ORM objects or a unit-of-work flush
+    await db.execute(insert(Conversation).values(id=conv_id))
+    await db.execute(insert(ConversationParticipant), [
+        {"conversation_id": conv_id, "wallet_address": normalize_wallet(wallet_a)},
+        {"conversation_id": conv_id, "wallet_address": normalize_wallet(wallet_b)},
+    ])
     await db.commit()
-    return conv.id
-
-
-async def get_conversation_peer(db: AsyncSession, conversation_id: str, my_wallet: str) -> Optional[str]:
-    """Get the other participant's wallet in a conversation."""
-    result = await db.execute(
-        select(ConversationParticipant.wallet_address).where(
-            ConversationParticipant.conversation_id == conversation_id,
-            ConversationParticipant.wallet_address != my_wallet.lower(),
-        )
-    )
-    return result.scalar()
+    return conv_id
 
 
 # ─── WebSocket Message Handlers ──────────────────────────────────────
 
 async def handle_create_conversation(ws: WebSocket, wallet: str, data: dict):
     """Handle create_conversation message type."""
-    peer_wallet = data.get("peer_wallet", "").strip().lower()
+    peer_wallet = normalize_wallet(data.get("peer_wallet", "").strip())
     if not peer_wallet:
-        await ws.send_json({"type": "error", "message": "peer_wallet required"})
+        await send_json(ws, {"type": "error", "message": "peer_wallet required"})
+        return
+    if peer_wallet == wallet:
+        await send_json(ws, {"type": "error", "message": "Cannot start a conversation with yourself"})
         return
 
     async with AsyncSessionLocal() as db:
         existing = await find_conversation(db, wallet, peer_wallet)
         if existing:
-            await ws.send_json({
+            await send_json(ws, {
                 "type": "conversation_created",
                 "conversation_id": existing,
                 "peer": peer_wallet,
@@ -119,7 +227,7 @@ async def handle_create_conversation(ws: WebSocket, wallet: str, data: dict):
 
         conv_id = await create_conversation_db(db, wallet, peer_wallet)
 
-    await ws.send_json({
+    await send_json(ws, {
         "type": "conversation_created",
         "conversation_id": conv_id,
         "peer": peer_wallet,
@@ -127,7 +235,7 @@ async def handle_create_conversation(ws: WebSocket, wallet: str, data: dict):
     })
 
     # Notify peer if online
-    await manager.send_to(peer_wallet, {
+    manager.send_to(peer_wallet, {
         "type": "conversation_created",
         "conversation_id": conv_id,
         "peer": wallet,
@@ -141,36 +249,43 @@ async def handle_send_message(ws: WebSocket, wallet: str, data: dict, force: boo
     content = data.get("content", "").strip()
 
     if not conversation_id or not content:
-        await ws.send_json({"type": "error", "message": "conversation_id and content required"})
+        await send_json(ws, {"type": "error", "message": "conversation_id and content required"})
         return
 
     async with AsyncSessionLocal() as db:
-        # Verify sender is a participant
-        result = await db.execute(
-            select(ConversationParticipant).where(
+        # Membership check and peer lookup from one two-row read
+        result = await db.execute(lambda_stmt(
+            lambda: select(ConversationParticipant.wallet_address).where(
                 ConversationParticipant.conversation_id == conversation_id,
-                ConversationParticipant.wallet_address == wallet,
             )
-        )
-        if not result.scalar():
-            await ws.send_json({"type": "error", "message": "Not a participant in this conversation"})
+        ))
+        participants = result.scalars().all()
+        if wallet not in participants:
+            await send_json(ws, {"type": "error", "message": "Not a participant in this conversation"})
             return
 
-        # Get peer wallet
-        peer = await get_conversation_peer(db, conversation_id, wallet)
+        peer = next((w for w in participants if w != wallet), None)
 
-        # Handle redaction
-        original_content = content
+        # Handle redaction — redact() already reports what it removed, so skip the rescan
         if redact:
             redaction = await guard.redact(content)
+            content_hash = redaction["original_hash"]
             content = redaction["redacted_text"]
-
-        # Run GuardLayer scan
-        scan_result = await guard.scan(content, use_llm=not force)
+            is_risky = bool(redaction["categories"])
+            scan_result = {
+                "is_risky": is_risky,
+                "severity": redaction["severity"],
+                "categories": redaction["categories"],
+                "event_hash": guard.event_hash(content_hash, is_risky, redaction["categories"]),
+            }
+        else:
+            # Run GuardLayer scan
+            scan_result = await guard.scan(content, use_llm=not force)
+            content_hash = scan_result["content_hash"]
 
         # If risky and not forced/redacted, return DLP warning
         if scan_result["is_risky"] and not force and not redact:
-            await ws.send_json({
+            await send_json(ws, {
                 "type": "dlp_warning",
                 "conversation_id": conversation_id,
                 "warning": f"Sensitive data detected ({scan_result['severity']}): {', '.join(scan_result['categories'])}",
@@ -184,27 +299,29 @@ async def handle_send_message(ws: WebSocket, wallet: str, data: dict, force: boo
             return
 
         # Save message to DB
-        content_hash = hashlib.sha256(original_content.encode()).hexdigest()
         risk_score = SEVERITY_SCORES.get(scan_result.get("severity", "low"), 0.0)
 
-        msg = Message(
-            id=str(uuid.uuid4()),
-            conversation_id=conversation_id,
-            sender_wallet=wallet,
-            content=content,
-            content_hash=content_hash,
-            is_delivered=False,
-            is_read=False,
-            risk_score=risk_score,
-            was_blocked=scan_result["is_risky"],
-            event_hash=scan_result["event_hash"],
-            risk_categories=scan_result["categories"] if scan_result["is_risky"] else None,
-            redacted=redact,
-            user_override=force and scan_result["is_risky"],
-            created_at=datetime.utcnow(),
-        )
-        db.add(msg)
-        await db.commit()
+        now = datetime.utcnow()
+        msg = {
+            "id": generate_uuid(),
+            "conversation_id": conversation_id,
+            "sender_wallet": wallet,
+            "content": content,
+            "content_hash": content_hash,
+            "created_at": now,
+            "expires_at": now + MESSAGE_TTL,
+            "is_delivered": False,
+            "is_read": False,
+            "risk_score": risk_score,
+            "was_blocked": scan_result["is_risky"],
+            "event_hash": scan_result["event_hash"],
+            "risk_categories": scan_result["categories"] if scan_result["is_risky"] else None,
+            "redacted": redact,
+            "user_override": force and scan_result["is_risky"],
+        }
+
+    # Persist through the batched writer — concurrent sends share one INSERT
+    await write_buffer.add(Message, msg)
 
     # Add to Merkle audit trail
     batcher = MerkleBatcher.get_instance()
@@ -216,25 +333,25 @@ async def handle_send_message(ws: WebSocket, wallet: str, data: dict, force: boo
 
     # Build message payload
     msg_payload = {
-        "message_id": msg.id,
+        "message_id": msg["id"],
         "conversation_id": conversation_id,
         "sender": wallet,
         "content": content,
         "redacted": redact,
         "risk_detected": scan_result["is_risky"],
         "user_override": force and scan_result["is_risky"],
-        "timestamp": msg.created_at.isoformat() + "Z",
-        "expires_at": msg.expires_at.isoformat() + "Z" if msg.expires_at else None,
+        "timestamp": msg["created_at"],
+        "expires_at": msg["expires_at"],
         "is_delivered": False,
         "is_read": False,
     }
 
     # Push to receiver
     if peer:
-        await manager.send_to(peer, {**msg_payload, "type": "new_message"})
+        manager.send_to(peer, {**msg_payload, "type": "new_message"})
 
     # Confirm to sender
-    await ws.send_json({**msg_payload, "type": "message_sent"})
+    await send_json(ws, {**msg_payload, "type": "message_sent"})
 
 
 async def handle_delivered(ws: WebSocket, wallet: str, data: dict):
@@ -244,20 +361,23 @@ async def handle_delivered(ws: WebSocket, wallet: str, data: dict):
         return
 
     async with AsyncSessionLocal() as db:
+        # Flip the flag and fetch the sender in one round-trip
         result = await db.execute(
-            select(Message).where(Message.id == message_id)
+            update(Message)
+            .where(Message.id == message_id, Message.is_delivered == False)
+            .values(is_delivered=True)
+            .returning(Message.sender_wallet)
         )
-        msg = result.scalar()
-        if msg and not msg.is_delivered:
-            msg.is_delivered = True
-            await db.commit()
-
-            # Notify sender that message was delivered
-            await manager.send_to(msg.sender_wallet, {
-                "type": "delivery_update",
-                "message_id": message_id,
-                "is_delivered": True,
-            })
+        sender = result.scalar()
+        await db.commit()
+
+    if sender:
+        # Notify sender that message was delivered
+        manager.send_to(sender, {
+            "type": "delivery_update",
+            "message_id": message_id,
+            "is_delivered": True,
+        })
 
 
 async def handle_read(ws: WebSocket, wallet: str, data: dict):
@@ -267,24 +387,26 @@ async def handle_read(ws: WebSocket, wallet: str, data: dict):
         return
 
     async with AsyncSessionLocal() as db:
-        senders = set()
-        for mid in message_ids:
-            result = await db.execute(
-                select(Message).where(Message.id == mid)
+        # Filter, flip and collect senders in one round-trip
+        result = await db.execute(
+            update(Message)
+            .where(
+                Message.id.in_(message_ids),
+                Message.is_read == False,
+                Message.sender_wallet != wallet,
             )
-            msg = result.scalar()
-            if msg and not msg.is_read and msg.sender_wallet != wallet:
-                msg.is_read = True
-                senders.add(msg.sender_wallet)
+            .values(is_read=True)
+            .returning(Message.sender_wallet)
+        )
+        senders = set(result.scalars().all())
         await db.commit()
 
-        # Notify senders
-        for sender in senders:
-            await manager.send_to(sender, {
-                "type": "read_update",
-                "message_ids": message_ids,
-                "reader": wallet,
-            })
+        # Notify senders (one encode shared by every recipient)
+        manager.send_to_many(senders, {
+            "type": "read_update",
+            "message_ids": message_ids,
+            "reader": wallet,
+        })
 
 
 # ─── REST Endpoints (Read-Only) ──────────────────────────────────────
@@ -295,69 +417,53 @@ async def get_conversations(
     db: AsyncSession = Depends(get_db),
 ):
     """Get all conversations for a wallet with latest message preview."""
-    w = wallet.lower()
+    w = normalize_wallet(wallet)
+    now = datetime.utcnow()
 
+    # One round-trip: my participations, self-joined for the peer, outer-joined
+    # to live messages for counts, plus a correlated subquery for the preview
+    me = aliased(ConversationParticipant)
+    peer = aliased(ConversationParticipant)
+    latest = aliased(Message)
+    preview = (
+        select(func.substr(latest.content, 1, 50))
+        .where(latest.conversation_id == me.conversation_id, latest.expires_at > now)
+        .order_by(desc(latest.created_at))
+        .limit(1)
+        .correlate(me)
+        .scalar_subquery()
+    )
+    last_message_time = func.max(Message.created_at)
     result = await db.execute(
-        select(ConversationParticipant.conversation_id).where(
-            ConversationParticipant.wallet_address == w
+        select(
+            me.conversation_id,
+            peer.wallet_address,
+            preview,
+            last_message_time,
+            func.count(Message.id),
+            func.count(Message.id).filter(Message.sender_wallet != w, Message.is_read == False),
         )
+        .outerjoin(peer, and_(peer.conversation_id == me.conversation_id, peer.wallet_address != w))
+        .outerjoin(Message, and_(Message.conversation_id == me.conversation_id, Message.expires_at > now))
+        .where(me.wallet_address == w)
+        .group_by(me.conversation_id, peer.wallet_address)
+        # Most recent first; conversations with no live messages last
+        .order_by(desc(last_message_time).nulls_last())
     )
-    conv_ids = [row[0] for row in result.all()]
 
-    conversations = []
-    now = datetime.utcnow()
-    for conv_id in conv_ids:
-        # Get peer
-        peer_result = await db.execute(
-            select(ConversationParticipant.wallet_address).where(
-                ConversationParticipant.conversation_id == conv_id,
-                ConversationParticipant.wallet_address != w,
-            )
-        )
-        peer = peer_result.scalar()
-
-        # Latest non-expired message
-        msg_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conv_id, Message.expires_at > now)
-            .order_by(desc(Message.created_at))
-            .limit(1)
-        )
-        latest = msg_result.scalar()
-
-        # Non-expired message count
-        count_result = await db.execute(
-            select(func.count()).select_from(Message).where(
-                Message.conversation_id == conv_id,
-                Message.expires_at > now,
-            )
-        )
-        msg_count = count_result.scalar() or 0
-
-        # Unread count (non-expired)
-        unread_result = await db.execute(
-            select(func.count()).select_from(Message).where(
-                Message.conversation_id == conv_id,
-                Message.sender_wallet != w,
-                Message.is_read == False,
-                Message.expires_at > now,
-            )
-        )
-        unread_count = unread_result.scalar() or 0
-
-        conversations.append({
+    conversations = [
+        {
             "conversation_id": conv_id,
-            "peer": peer,
-            "last_message": latest.content[:50] if latest else None,
-            "last_message_time": latest.created_at.isoformat() + "Z" if latest else None,
+            "peer": peer_wallet,
+            "last_message": last_message,
+            "last_message_time": last_time,
             "message_count": msg_count,
             "unread_count": unread_count,
-        })
-
-    # Sort by latest message time (most recent first)
-    conversations.sort(key=lambda x: x["last_message_time"] or "", reverse=True)
+        }
+        for conv_id, peer_wallet, last_message, last_time, msg_count, unread_count in result.all()
+    ]
 
-    return {"conversations": conversations}
+    return UTCJSONResponse({"conversations": conversations})
 
 
 @router.get("/conversations/{conversation_id}/messages")
@@ -368,8 +474,21 @@ async def get_messages(
 ):
     """Get non-expired messages in a conversation."""
     now = datetime.utcnow()
+    # Project only the serialized columns — plain rows, no ORM identity-map overhead
     result = await db.execute(
-        select(Message)
+        select(
+            Message.id,
+            Message.conversation_id,
+            Message.sender_wallet,
+            Message.content,
+            Message.redacted,
+            Message.risk_categories,
+            Message.user_override,
+            Message.is_delivered,
+            Message.is_read,
+            Message.created_at,
+            Message.expires_at,
+        )
         .where(
             Message.conversation_id == conversation_id,
             Message.expires_at > now,
@@ -377,9 +496,9 @@ async def get_messages(
         .order_by(desc(Message.created_at))
         .limit(limit)
     )
-    messages = result.scalars().all()
+    messages = result.all()
 
-    return {
+    return UTCJSONResponse({
         "messages": [
             {
                 "id": m.id,
@@ -391,13 +510,24 @@ async def get_messages(
                 "user_override": m.user_override,
                 "is_delivered": m.is_delivered,
                 "is_read": m.is_read,
-                "timestamp": m.created_at.isoformat() + "Z" if m.created_at else None,
-                "expires_at": m.expires_at.isoformat() + "Z" if m.expires_at else None,
+                "timestamp": m.created_at,
+                "expires_at": m.expires_at,
             }
             for m in reversed(messages)
         ],
         "count": len(messages),
-    }
+    })
+
+
+# Message type → handler(ws, wallet, data); anything else gets a pong
+MESSAGE_HANDLERS = {
+    "create_conversation": handle_create_conversation,
+    "send_message": handle_send_message,
+    "force_send": partial(handle_send_message, force=True),
+    "redact_send": partial(handle_send_message, redact=True),
+    "delivered": handle_delivered,
+    "read": handle_read,
+}
 
 
 # ─── WebSocket Endpoint ──────────────────────────────────────────────
@@ -419,7 +549,7 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=4001, reason="Invalid token")
         return
 
-    wallet = payload.get("sub", "").lower()
+    wallet = normalize_wallet(payload.get("sub", ""))
     if not wallet:
         await websocket.close(code=4001, reason="Invalid token payload")
         return
@@ -430,36 +560,22 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             raw = await websocket.receive_text()
 
+            # Client keep-alive: the traffic alone keeps proxies from idling us out,
+            # and server-side liveness is uvicorn's protocol-level PING/PONG
+            # (--ws-ping-interval / --ws-ping-timeout), so no app-level reply
+            if raw == "ping":
+                continue
+
             try:
-                data = json.loads(raw)
-            except json.JSONDecodeError:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
                 # Treat non-JSON as ping
-                await websocket.send_json({
-                    "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                })
+                await send_pong(websocket)
                 continue
 
-            msg_type = data.get("type", "ping")
-
-            if msg_type == "create_conversation":
-                await handle_create_conversation(websocket, wallet, data)
-            elif msg_type == "send_message":
-                await handle_send_message(websocket, wallet, data)
-            elif msg_type == "force_send":
-                await handle_send_message(websocket, wallet, data, force=True)
-            elif msg_type == "redact_send":
-                await handle_send_message(websocket, wallet, data, redact=True)
-            elif msg_type == "delivered":
-                await handle_delivered(websocket, wallet, data)
-            elif msg_type == "read":
-                await handle_read(websocket, wallet, data)
-            else:
-                await websocket.send_json({
-                    "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                })
+            handler = MESSAGE_HANDLERS.get(data.get("type"), send_pong)
+            await handler(websocket, wallet, data)
     except WebSocketDisconnect:
-        manager.disconnect(wallet)
+        manager.disconnect(wallet, websocket)
     except Exception:
-        manager.disconnect(wallet)
+        manager.disconnect(wallet, websocket)
@@ -5,64 +5,129 @@ Aggregated dashboard data endpoints
 import hashlib
 import json
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Optional, Tuple
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, desc, func
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import bindparam, lambda_stmt, select, desc, func, true
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.models import LoginEvent, GuardEvent, TransactionEvent
+from app.responses import UTCJSONResponse
 from app.services.merkle import MerkleBatcher
-from app.services.enforcement import SecurityEnforcement
+from app.services.response_cache import ALL_WALLETS, ResponseCache
+from app.services.enforcement import SecurityEnforcement, compute_trust_score
 from app.config import settings
 
 router = APIRouter()
 
-
-@router.get("/overview")
+response_cache = ResponseCache.get_instance()
+
+# Security report: static lines, and threat tiers checked from the top
+REPORT_TITLE = "## 🛡️ SentinelX Security Report"
+REPORT_FOOTER = (
+    "",
+    "*All events are cryptographically hashed and Merkle-batched for on-chain verification on Ethereum Sepolia.*",
+)
+THREAT_LEVELS = (  # (min high-risk logins, min threats, label) — either minimum qualifies
+    (3, None, "🔴 HIGH"),
+    (1, 3, "🟡 MEDIUM"),
+)
+
+# Trust-score reads: built once at import, bound per request, so every call
+# hits the compiled-statement cache (and asyncpg's prepared statement)
+TRUST_LOGINS_STMT = (
+    select(LoginEvent.risk_score, LoginEvent.risk_level)
+    .where(LoginEvent.wallet_address == bindparam("w"))
+    .order_by(desc(LoginEvent.timestamp)).limit(100)
+)
+TRUST_GUARDS_STMT = (
+    select(GuardEvent.risk_detected, GuardEvent.user_override)
+    .where(GuardEvent.wallet_address == bindparam("w"))
+    .order_by(desc(GuardEvent.timestamp)).limit(100)
+)
+TRUST_TXS_STMT = (
+    select(TransactionEvent.risk_score, TransactionEvent.status, TransactionEvent.cooldown_until)
+    .where((TransactionEvent.sender_wallet == bindparam("w")) | (TransactionEvent.recipient_wallet == bindparam("w")))
+    .order_by(desc(TransactionEvent.created_at)).limit(100)
+)
+
+
+@router.get("/overview", response_class=UTCJSONResponse)
 async def get_overview(
+    request: Request,
     wallet_address: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get complete dashboard overview data"""
-    # Login events
-    login_query = select(LoginEvent).order_by(desc(LoginEvent.timestamp)).limit(100)
-    if wallet_address:
-        login_query = login_query.where(LoginEvent.wallet_address == wallet_address.lower())
-    login_result = await db.execute(login_query)
-    login_events = login_result.scalars().all()
-
-    # Guard events
-    guard_query = select(GuardEvent).order_by(desc(GuardEvent.timestamp)).limit(100)
-    if wallet_address:
-        guard_query = guard_query.where(GuardEvent.wallet_address == wallet_address.lower())
-    guard_result = await db.execute(guard_query)
-    guard_events = guard_result.scalars().all()
-
-    # Transaction events
-    tx_query = select(TransactionEvent).order_by(desc(TransactionEvent.created_at)).limit(100)
-    if wallet_address:
-        w = wallet_address.lower()
-        tx_query = tx_query.where(
+    """
+    Get complete dashboard overview data.
+    Serialized bodies are cached per wallet until the TTL or the next write, and
+    an ETag lets polling clients revalidate with If-None-Match for a bodiless 304.
+    """
+    key = wallet_address.lower() if wallet_address else ALL_WALLETS
+    etag, body = await response_cache.get_or_build(
+        "overview", key, lambda: _encode(_build_overview(db, wallet_address)),
+    )
+    return _conditional_response(request, etag, body)
+
+
+async def _encode(response: Awaitable[UTCJSONResponse]) -> Tuple[str, bytes]:
+    """Render once and tag the body for If-None-Match revalidation"""
+    body = (await response).body
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"', body
+
+
+def _conditional_response(request: Request, etag: str, body: bytes) -> Response:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _build_overview(db: AsyncSession, wallet_address: Optional[str]) -> UTCJSONResponse:
+    """Run the overview queries and render the response"""
+    # Hot selects go through lambda_stmt: built and cache-keyed once per shape,
+    # with the wallet bound as a parameter on each call
+    w = wallet_address.lower() if wallet_address else None
+
+    # Login events — only the columns rendered below, all covered by ix_login_events_wallet_ts
+    login_query = lambda_stmt(lambda: select(
+        LoginEvent.wallet_address, LoginEvent.timestamp,
+        LoginEvent.risk_score, LoginEvent.risk_level, LoginEvent.event_hash,
+        LoginEvent.geo_country, LoginEvent.geo_city, LoginEvent.geo_lat, LoginEvent.geo_lng,
+    ).order_by(desc(LoginEvent.timestamp)).limit(100))
+    if w:
+        login_query += lambda s: s.where(LoginEvent.wallet_address == w)
+
+    # Guard events — likewise covered by ix_guard_events_wallet_ts
+    guard_query = lambda_stmt(lambda: select(
+        GuardEvent.timestamp, GuardEvent.risk_detected, GuardEvent.user_override,
+        GuardEvent.risk_categories, GuardEvent.content_hash, GuardEvent.event_hash,
+    ).order_by(desc(GuardEvent.timestamp)).limit(100))
+    if w:
+        guard_query += lambda s: s.where(GuardEvent.wallet_address == w)
+
+    # Transaction events — just what the trust score reads
+    tx_query = lambda_stmt(lambda: select(
+        TransactionEvent.risk_score, TransactionEvent.status, TransactionEvent.cooldown_until,
+    ).order_by(desc(TransactionEvent.created_at)).limit(100))
+    if w:
+        tx_query += lambda s: s.where(
             (TransactionEvent.sender_wallet == w) | (TransactionEvent.recipient_wallet == w)
         )
-    tx_result = await db.execute(tx_query)
-    tx_events = tx_result.scalars().all()
+
+    # All on the request's session, one after another: these are short indexed
+    # reads, and fanning them out over extra pooled connections multiplied pool
+    # pressure on every cold build (e.g. a burst of misses after invalidate_all)
+    login_events = (await db.execute(login_query)).all()
+    guard_events = (await db.execute(guard_query)).all()
+    tx_events = (await db.execute(tx_query)).all()
+    # Aggregates are counted by the database over every matching row, not limited by fetch limit
+    stats = await _overview_stats(db, w)
 
     # Merkle stats
     batcher = MerkleBatcher.get_instance()
     merkle_stats = batcher.get_stats()
 
-    # Compute aggregates - use COUNT query for accurate total (not limited by fetch limit)
-    count_query = select(func.count()).select_from(LoginEvent)
-    if wallet_address:
-        count_query = count_query.where(LoginEvent.wallet_address == wallet_address.lower())
-    count_result = await db.execute(count_query)
-    total_logins = count_result.scalar() or 0
-    risk_scores = [e.risk_score for e in login_events]
-    avg_risk = round(sum(risk_scores) / len(risk_scores), 4) if risk_scores else 0
-
     # Trust score computation
     trust_score = _compute_trust_score(login_events, guard_events, tx_events)
 
@@ -81,110 +146,149 @@ async def get_overview(
             enf_level = "high_risk"
         trust_score = {"score": enf_score, "level": enf_level}
 
-    return {
+    # One pass over the login rows builds all three login payloads; rows are
+    # unpacked positionally (column order of login_query) instead of per-attribute
+    risk_timeline, map_points, recent_logins = [], [], []
+    for i, (wallet, ts, score, level, event_hash, country, city, lat, lng) in enumerate(login_events):
+        risk_timeline.append({
+            "timestamp": ts,
+            "risk_score": score,
+            "risk_level": level,
+            "country": country,
+            "city": city,
+        })
+        if lat and lng:
+            map_points.append({
+                "lat": lat,
+                "lng": lng,
+                "risk_score": score,
+                "risk_level": level,
+                "country": country,
+                "city": city,
+                "timestamp": ts,
+            })
+        if i < 10:
+            recent_logins.append({
+                "wallet": wallet,
+                "risk_score": score,
+                "risk_level": level,
+                "country": country,
+                "city": city,
+                "timestamp": ts,
+                "event_hash": event_hash,
+            })
+    risk_timeline.reverse()  # oldest first
+
+    # Returned directly: skips jsonable_encoder, and orjson formats the datetimes
+    return UTCJSONResponse({
         "stats": {
-            "total_logins": total_logins,
-            "avg_risk_score": avg_risk,
-            "high_risk_logins": sum(1 for e in login_events if e.risk_level == "high"),
-            "medium_risk_logins": sum(1 for e in login_events if e.risk_level == "medium"),
-            "low_risk_logins": sum(1 for e in login_events if e.risk_level == "low"),
-            "total_guard_scans": len(guard_events),
-            "threats_detected": sum(1 for e in guard_events if e.risk_detected),
-            "threats_overridden": sum(1 for e in guard_events if e.user_override),
+            **stats,
             "total_batches": merkle_stats["total_batches"],
             "events_on_chain": merkle_stats["total_events_batched"],
             "pending_events": merkle_stats["pending_events"],
-            "total_transactions": len(tx_events),
-            "blocked_transactions": sum(1 for e in tx_events if e.status == "blocked"),
-            "total_eth_transferred": round(sum(e.amount_eth for e in tx_events if e.status == "completed"), 6),
         },
         "trust_score": trust_score,
         "enforcement": enforcement,
-        "risk_timeline": [
-            {
-                "timestamp": e.timestamp.isoformat() + "Z" if e.timestamp else None,
-                "risk_score": e.risk_score,
-                "risk_level": e.risk_level,
-                "country": e.geo_country,
-                "city": e.geo_city,
-            }
-            for e in reversed(login_events)
-        ],
-        "map_points": [
-            {
-                "lat": e.geo_lat,
-                "lng": e.geo_lng,
-                "risk_score": e.risk_score,
-                "risk_level": e.risk_level,
-                "country": e.geo_country,
-                "city": e.geo_city,
-                "timestamp": e.timestamp.isoformat() + "Z" if e.timestamp else None,
-            }
-            for e in login_events
-            if e.geo_lat and e.geo_lng
-        ],
-        "recent_logins": [
-            {
-                "wallet": e.wallet_address,
-                "risk_score": e.risk_score,
-                "risk_level": e.risk_level,
-                "country": e.geo_country,
-                "city": e.geo_city,
-                "timestamp": e.timestamp.isoformat() + "Z" if e.timestamp else None,
-                "event_hash": e.event_hash,
-            }
-            for e in login_events[:10]
-        ],
+        "risk_timeline": risk_timeline,
+        "map_points": map_points,
+        "recent_logins": recent_logins,
         "recent_guard_events": [
             {
                 "content_hash": e.content_hash[:16] + "...",
                 "risk_detected": e.risk_detected,
                 "categories": e.risk_categories,
                 "user_override": e.user_override,
-                "timestamp": e.timestamp.isoformat() + "Z" if e.timestamp else None,
+                "timestamp": e.timestamp,
                 "event_hash": e.event_hash,
             }
             for e in guard_events[:10]
         ],
         "audit_batches": merkle_stats["batches"],
-    }
+    })
+
+
+async def _overview_stats(db: AsyncSession, w: Optional[str]) -> dict:
+    """
+    Overview counters for all three event tables in one round-trip: each table
+    is reduced to a single row of conditional aggregates, and the three rows
+    are cross-joined.
+    """
+    login_filter = [LoginEvent.wallet_address == w] if w else []
+    guard_filter = [GuardEvent.wallet_address == w] if w else []
+    tx_filter = [(TransactionEvent.sender_wallet == w) | (TransactionEvent.recipient_wallet == w)] if w else []
+
+    logins = select(
+        func.count().label("total_logins"),
+        func.avg(LoginEvent.risk_score).label("avg_risk_score"),
+        func.count().filter(LoginEvent.risk_level == "high").label("high_risk_logins"),
+        func.count().filter(LoginEvent.risk_level == "medium").label("medium_risk_logins"),
+        func.count().filter(LoginEvent.risk_level == "low").label("low_risk_logins"),
+    ).where(*login_filter).subquery()
+    guards = select(
+        func.count().label("total_guard_scans"),
+        func.count().filter(GuardEvent.risk_detected == True).label("threats_detected"),
+        func.count().filter(GuardEvent.user_override == True).label("threats_overridden"),
+    ).where(*guard_filter).subquery()
+    txs = select(
+        func.count().label("total_transactions"),
+        func.count().filter(TransactionEvent.status == "blocked").label("blocked_transactions"),
+        func.sum(TransactionEvent.amount_eth).filter(TransactionEvent.status == "completed").label("total_eth_transferred"),
+    ).where(*tx_filter).subquery()
+
+    # Single-row operands, so joining on TRUE is the intended cross join
+    rows = (await db.execute(
+        select(logins, guards, txs).select_from(logins.join(guards, true()).join(txs, true()))
+    )).all()
+    stats = dict(rows[0]._mapping)
+    stats["avg_risk_score"] = round(stats["avg_risk_score"] or 0, 4)
+    stats["total_eth_transferred"] = round(stats["total_eth_transferred"] or 0, 6)
+    return stats
 
 
 @router.get("/security-report")
 async def generate_security_report(
+    request: Request,
     wallet_address: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Generate an AI-powered security summary report"""
-    # Gather data
-    login_query = select(LoginEvent).order_by(desc(LoginEvent.timestamp)).limit(50)
+    """Generate an AI-powered security summary report (cached like the overview)"""
+    key = wallet_address.lower() if wallet_address else ALL_WALLETS
+    etag, body = await response_cache.get_or_build(
+        "security-report", key, lambda: _encode(_build_security_report(db, wallet_address)),
+    )
+    return _conditional_response(request, etag, body)
+
+
+async def _build_security_report(db: AsyncSession, wallet_address: Optional[str]) -> UTCJSONResponse:
+    """Run the report queries and render the response"""
+    # Gather data — the login total rides along as a window count (not limited by fetch limit)
+    login_query = select(
+        LoginEvent.risk_score, LoginEvent.risk_level, LoginEvent.event_hash,
+        LoginEvent.geo_country, LoginEvent.geo_city,
+        func.count().over().label("total_logins"),
+    ).order_by(desc(LoginEvent.timestamp)).limit(50)
     if wallet_address:
         login_query = login_query.where(LoginEvent.wallet_address == wallet_address.lower())
-    login_result = await db.execute(login_query)
-    logins = login_result.scalars().all()
 
-    guard_query = select(GuardEvent).order_by(desc(GuardEvent.timestamp)).limit(50)
+    guard_query = select(
+        GuardEvent.risk_detected, GuardEvent.user_override,
+    ).order_by(desc(GuardEvent.timestamp)).limit(50)
     if wallet_address:
         guard_query = guard_query.where(GuardEvent.wallet_address == wallet_address.lower())
-    guard_result = await db.execute(guard_query)
-    guards = guard_result.scalars().all()
+    logins = (await db.execute(login_query)).all()
+    guards = (await db.execute(guard_query)).all()
 
-    batcher = MerkleBatcher.get_instance()
+    merkle_stats = MerkleBatcher.get_instance().get_counts()
 
     # Build report (deterministic, no LLM needed)
-    # Use COUNT query for accurate total (not limited by fetch limit)
-    count_query = select(func.count()).select_from(LoginEvent)
-    if wallet_address:
-        count_query = count_query.where(LoginEvent.wallet_address == wallet_address.lower())
-    count_result = await db.execute(count_query)
-    total_logins = count_result.scalar() or 0
+    total_logins = logins[0].total_logins if logins else 0
     high_risk = [e for e in logins if e.risk_level == "high"]
     unique_countries = list(set(e.geo_country for e in logins if e.geo_country))
     threats = [e for e in guards if e.risk_detected]
     overrides = [e for e in guards if e.user_override]
 
     report_lines = [
-        f"## 🛡️ SentinelX Security Report",
+        REPORT_TITLE,
         f"**Generated:** {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}",
         "",
         f"### Login Activity",
@@ -210,24 +314,23 @@ async def generate_security_report(
 
     report_lines.extend([
         f"\n### On-Chain Audit",
-        f"- **{batcher.get_stats()['total_batches']}** Merkle batches created",
-        f"- **{batcher.get_stats()['total_events_batched']}** events recorded on-chain",
-        f"- **{batcher.get_stats()['pending_events']}** events pending",
+        f"- **{merkle_stats['total_batches']}** Merkle batches created",
+        f"- **{merkle_stats['total_events_batched']}** events recorded on-chain",
+        f"- **{merkle_stats['pending_events']}** events pending",
     ])
 
-    severity = "🟢 LOW"
-    if len(high_risk) > 2:
-        severity = "🔴 HIGH"
-    elif len(high_risk) > 0 or len(threats) > 2:
-        severity = "🟡 MEDIUM"
+    severity = next(
+        (
+            label for min_high, min_threats, label in THREAT_LEVELS
+            if len(high_risk) >= min_high or (min_threats is not None and len(threats) >= min_threats)
+        ),
+        "🟢 LOW",
+    )
 
-    report_lines.extend([
-        f"\n### Overall Threat Level: {severity}",
-        "",
-        f"*All events are cryptographically hashed and Merkle-batched for on-chain verification on Ethereum Sepolia.*",
-    ])
+    report_lines.append(f"\n### Overall Threat Level: {severity}")
+    report_lines.extend(REPORT_FOOTER)
 
-    return {
+    return UTCJSONResponse({
         "report": "\n".join(report_lines),
         "threat_level": severity,
         "stats": {
@@ -236,7 +339,7 @@ async def generate_security_report(
             "threats_detected": len(threats),
             "overrides": len(overrides),
         },
-    }
+    })
 
 
 # ─── Trust Score Computation ──────────────────────────────────────────
@@ -246,44 +349,7 @@ def _compute_trust_score(login_events, guard_events, tx_events) -> dict:
     Compute a unified Trust Score (0-100) from all risk engines.
     Higher = more trusted. Uses actual risk scores and recency decay.
     """
-    score = 100.0
-
-    # Login penalties (max 40) — use actual risk scores with recency decay
-    if login_events:
-        login_penalty = 0.0
-        for i, e in enumerate(login_events):
-            recency = max(0.5, 1.0 - i * 0.015)
-            severity = e.risk_score if e.risk_score else 0.5
-            if e.risk_level == "high":
-                login_penalty += 10 * severity * recency
-            elif e.risk_level == "medium":
-                login_penalty += 4 * severity * recency
-        score -= min(40, login_penalty)
-
-    # Guard penalties (max 30) — with recency decay
-    if guard_events:
-        guard_penalty = 0.0
-        for i, e in enumerate(guard_events):
-            recency = max(0.5, 1.0 - i * 0.015)
-            if e.risk_detected:
-                guard_penalty += 5 * recency
-            if e.user_override:
-                guard_penalty += 2 * recency
-        score -= min(30, guard_penalty)
-
-    # Transaction penalties (max 30) — use actual risk scores with recency
-    if tx_events:
-        tx_penalty = 0.0
-        for i, e in enumerate(tx_events):
-            recency = max(0.5, 1.0 - i * 0.015)
-            severity = e.risk_score if e.risk_score else 0.5
-            if e.status == "blocked":
-                tx_penalty += 12 * severity * recency
-            elif e.cooldown_until is not None:
-                tx_penalty += 6 * severity * recency
-        score -= min(30, tx_penalty)
-
-    score = max(0, round(score))
+    score = compute_trust_score(login_events, guard_events, tx_events)
 
     if score >= 80:
         level = "trusted"
@@ -300,29 +366,25 @@ def _compute_trust_score(login_events, guard_events, tx_events) -> dict:
 
 @router.get("/trust-score")
 async def get_trust_score(
+    request: Request,
     wallet_address: str,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get the dynamic Trust Score for a wallet."""
+    """Get the dynamic Trust Score for a wallet (cached like the overview)"""
     w = wallet_address.lower()
-
-    login_result = await db.execute(
-        select(LoginEvent).where(LoginEvent.wallet_address == w)
-        .order_by(desc(LoginEvent.timestamp)).limit(100)
+    etag, body = await response_cache.get_or_build(
+        "trust-score", w, lambda: _encode(_build_trust_score(db, w)),
     )
-    login_events = login_result.scalars().all()
+    return _conditional_response(request, etag, body)
 
-    guard_result = await db.execute(
-        select(GuardEvent).where(GuardEvent.wallet_address == w)
-        .order_by(desc(GuardEvent.timestamp)).limit(100)
-    )
-    guard_events = guard_result.scalars().all()
 
-    tx_result = await db.execute(
-        select(TransactionEvent).where(
-            (TransactionEvent.sender_wallet == w) | (TransactionEvent.recipient_wallet == w)
-        ).order_by(desc(TransactionEvent.created_at)).limit(100)
-    )
-    tx_events = tx_result.scalars().all()
+async def _build_trust_score(db: AsyncSession, w: str) -> UTCJSONResponse:
+    """Run the trust-score reads and render the response"""
+    params = {"w": w}
+
+    # Three short reads of just the scored columns, on the request's session
+    login_events = (await db.execute(TRUST_LOGINS_STMT, params)).all()
+    guard_events = (await db.execute(TRUST_GUARDS_STMT, params)).all()
+    tx_events = (await db.execute(TRUST_TXS_STMT, params)).all()
 
-    return _compute_trust_score(login_events, guard_events, tx_events)
+    return UTCJSONResponse(_compute_trust_score(login_events, guard_events, tx_events))
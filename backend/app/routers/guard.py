@@ -2,22 +2,26 @@
 SentinelX GuardLayer Router
 LLM + Regex data leak prevention endpoints
 """
-import uuid
+import hashlib
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.models import GuardEvent
+from app.models.models import GuardEvent, generate_uuid
+from app.pagination import encode_cursor, decode_cursor, before_cursor
+from app.responses import UTCJSONResponse
 from app.services.guard_layer import GuardLayer
 from app.services.merkle import MerkleBatcher
+from app.services.response_cache import ResponseCache
 
 router = APIRouter()
-guard = GuardLayer()
+guard = GuardLayer.get_instance()
 
 
 class ScanRequest(BaseModel):
@@ -59,7 +63,7 @@ async def scan_content(req: ScanRequest, db: AsyncSession = Depends(get_db)):
 
     # Store guard event
     guard_event = GuardEvent(
-        id=str(uuid.uuid4()),
+        id=generate_uuid(),
         wallet_address=(req.wallet_address or "anonymous").lower(),
         content_hash=result["content_hash"],
         scan_type=result["scan_type"],
@@ -72,6 +76,7 @@ async def scan_content(req: ScanRequest, db: AsyncSession = Depends(get_db)):
     )
     db.add(guard_event)
     await db.commit()
+    ResponseCache.get_instance().invalidate(guard_event.wallet_address)
 
     # Add to Merkle batch
     batcher = MerkleBatcher.get_instance()
@@ -87,42 +92,48 @@ async def scan_content(req: ScanRequest, db: AsyncSession = Depends(get_db)):
     else:
         message = "✅ Content looks clean. No sensitive data detected."
 
-    return ScanResponse(
-        is_risky=result["is_risky"],
-        severity=result["severity"],
-        risk_score=result.get("risk_score", 0),
-        categories=result["categories"],
-        regex_findings=result["regex_findings"],
-        llm_result=result.get("llm_result"),
-        content_hash=result["content_hash"],
-        event_hash=result["event_hash"],
-        scan_type=result["scan_type"],
-        message=message,
-    )
+    # Already ScanResponse-shaped: returning the response directly skips
+    # FastAPI's validate-then-encode pass (the model still documents the schema)
+    return UTCJSONResponse({
+        "is_risky": result["is_risky"],
+        "severity": result["severity"],
+        "risk_score": result.get("risk_score", 0),
+        "categories": result["categories"],
+        "regex_findings": result["regex_findings"],
+        "llm_result": result.get("llm_result"),
+        "content_hash": result["content_hash"],
+        "event_hash": result["event_hash"],
+        "scan_type": result["scan_type"],
+        "message": message,
+    })
 
 
 @router.post("/override")
 async def override_guard(req: OverrideRequest, db: AsyncSession = Depends(get_db)):
     """User explicitly overrides a guard warning and sends anyway"""
-    result = await db.execute(
-        select(GuardEvent).where(GuardEvent.event_hash == req.event_hash)
+    try:
+        bytes.fromhex(req.event_hash)  # event_hash is stored as a binary digest
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid event hash")
+
+    # Flip the flag in place — no need to load the event first
+    await db.execute(
+        update(GuardEvent)
+        .where(GuardEvent.event_hash == req.event_hash)
+        .values(user_override=req.confirmed)
     )
-    event = result.scalar_one_or_none()
-
-    if event:
-        event.user_override = req.confirmed
-        await db.commit()
+    await db.commit()
+    ResponseCache.get_instance().invalidate(req.wallet_address)
 
     # Log override to Merkle batch
     batcher = MerkleBatcher.get_instance()
-    import hashlib, json
-    override_data = json.dumps({
+    override_data = orjson.dumps({
         "original_event": req.event_hash,
         "wallet": req.wallet_address,
         "override": req.confirmed,
         "timestamp": datetime.utcnow().isoformat(),
-    }, sort_keys=True)
-    override_hash = hashlib.sha256(override_data.encode()).hexdigest()
+    }, option=orjson.OPT_SORT_KEYS)
+    override_hash = hashlib.sha256(override_data).hexdigest()
     batcher.add_event(override_hash, event_type="guard_override")
 
     return {
@@ -137,18 +148,27 @@ async def override_guard(req: OverrideRequest, db: AsyncSession = Depends(get_db
 @router.get("/events")
 async def get_guard_events(
     wallet_address: Optional[str] = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get guard event history"""
-    query = select(GuardEvent).order_by(desc(GuardEvent.timestamp)).limit(limit)
+    """Get guard event history, newest first; pass next_cursor back for the next page"""
+    # Only the serialized columns — skips llm_response and ORM hydration
+    query = select(
+        GuardEvent.id, GuardEvent.content_hash, GuardEvent.scan_type, GuardEvent.risk_detected,
+        GuardEvent.risk_categories, GuardEvent.user_override, GuardEvent.event_hash, GuardEvent.timestamp,
+    ).order_by(desc(GuardEvent.timestamp), desc(GuardEvent.id)).limit(limit)
     if wallet_address:
         query = query.where(GuardEvent.wallet_address == wallet_address.lower())
+    after = decode_cursor(cursor)
+    if after:
+        # Keyset, not OFFSET: seeks straight into the (wallet, timestamp) index
+        query = query.where(before_cursor(GuardEvent.timestamp, GuardEvent.id, after))
 
     result = await db.execute(query)
-    events = result.scalars().all()
+    events = result.all()
 
-    return {
+    return UTCJSONResponse({
         "events": [
             {
                 "id": e.id,
@@ -158,12 +178,13 @@ async def get_guard_events(
                 "risk_categories": e.risk_categories,
                 "user_override": e.user_override,
                 "event_hash": e.event_hash,
-                "timestamp": e.timestamp.isoformat() + "Z" if e.timestamp else None,
+                "timestamp": e.timestamp,
             }
             for e in events
         ],
         "count": len(events),
-    }
+        "next_cursor": encode_cursor(events[-1].timestamp, events[-1].id) if len(events) == limit else None,
+    })
 
 
 @router.get("/stats")
@@ -172,16 +193,22 @@ async def get_guard_stats(
     db: AsyncSession = Depends(get_db),
 ):
     """Get aggregate guard statistics"""
-    query = select(GuardEvent)
+    # Counted in SQL — no need to load every scan to tally it
+    query = select(
+        func.count(),
+        func.count().filter(GuardEvent.risk_detected == True),
+        func.count().filter(GuardEvent.user_override == True),
+        func.count().filter(GuardEvent.risk_detected == True, GuardEvent.user_override.is_not(True)),
+    )
     if wallet_address:
         query = query.where(GuardEvent.wallet_address == wallet_address.lower())
 
     result = await db.execute(query)
-    events = result.scalars().all()
+    total, threats, overrides, blocked = result.one()
 
-    return {
-        "total_scans": len(events),
-        "threats_detected": sum(1 for e in events if e.risk_detected),
-        "overrides": sum(1 for e in events if e.user_override),
-        "blocked": sum(1 for e in events if e.risk_detected and not e.user_override),
-    }
+    return UTCJSONResponse({
+        "total_scans": total,
+        "threats_detected": threats,
+        "overrides": overrides,
+        "blocked": blocked,
+    })
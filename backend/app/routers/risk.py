@@ -2,17 +2,17 @@
 SentinelX Risk Engine Router
 AI-based login anomaly detection endpoints
 """
-import uuid
-from datetime import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.models import LoginEvent
+from app.pagination import encode_cursor, decode_cursor, before_cursor
+from app.responses import UTCJSONResponse
 from app.services.risk_engine import RiskEngine
 
 router = APIRouter()
@@ -68,20 +68,29 @@ async def compute_risk_score(req: RiskScoreRequest, db: AsyncSession = Depends(g
 async def get_risk_timeline(
     wallet_address: Optional[str] = None,
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get risk score timeline for dashboard visualization"""
-    query = select(LoginEvent).order_by(desc(LoginEvent.timestamp)).limit(limit)
+    """Get risk score timeline for dashboard visualization; next_cursor pages further back"""
+    # Only the serialized columns — plain rows, no ORM hydration
+    query = select(
+        LoginEvent.timestamp, LoginEvent.risk_score, LoginEvent.risk_level, LoginEvent.ip_hash,
+        LoginEvent.geo_country, LoginEvent.geo_city, LoginEvent.wallet_address, LoginEvent.event_hash,
+        LoginEvent.id,
+    ).order_by(desc(LoginEvent.timestamp), desc(LoginEvent.id)).limit(limit)
     if wallet_address:
         query = query.where(LoginEvent.wallet_address == wallet_address.lower())
+    after = decode_cursor(cursor)
+    if after:
+        query = query.where(before_cursor(LoginEvent.timestamp, LoginEvent.id, after))
 
     result = await db.execute(query)
-    events = result.scalars().all()
+    events = result.all()
 
     timeline = []
     for event in reversed(events):
         timeline.append({
-            "timestamp": event.timestamp.isoformat() + "Z" if event.timestamp else None,
+            "timestamp": event.timestamp,
             "risk_score": event.risk_score,
             "risk_level": event.risk_level,
             "ip_address": event.ip_hash[:12] + "..." if event.ip_hash else None,
@@ -91,7 +100,11 @@ async def get_risk_timeline(
             "event_hash": event.event_hash,
         })
 
-    return {"timeline": timeline, "count": len(timeline)}
+    return UTCJSONResponse({
+        "timeline": timeline,
+        "count": len(timeline),
+        "next_cursor": encode_cursor(events[-1].timestamp, events[-1].id) if len(events) == limit else None,
+    })
 
 
 @router.get("/map")
@@ -101,12 +114,15 @@ async def get_login_map(
     db: AsyncSession = Depends(get_db),
 ):
     """Get login origin coordinates for map visualization"""
-    query = select(LoginEvent).order_by(desc(LoginEvent.timestamp)).limit(limit)
+    query = select(
+        LoginEvent.geo_lat, LoginEvent.geo_lng, LoginEvent.risk_score, LoginEvent.risk_level,
+        LoginEvent.geo_country, LoginEvent.geo_city, LoginEvent.timestamp,
+    ).order_by(desc(LoginEvent.timestamp)).limit(limit)
     if wallet_address:
         query = query.where(LoginEvent.wallet_address == wallet_address.lower())
 
     result = await db.execute(query)
-    events = result.scalars().all()
+    events = result.all()
 
     points = []
     for event in events:
@@ -118,10 +134,10 @@ async def get_login_map(
                 "risk_level": event.risk_level,
                 "country": event.geo_country,
                 "city": event.geo_city,
-                "timestamp": event.timestamp.isoformat() + "Z" if event.timestamp else None,
+                "timestamp": event.timestamp,
             })
 
-    return {"points": points, "count": len(points)}
+    return UTCJSONResponse({"points": points, "count": len(points)})
 
 
 @router.get("/stats")
@@ -130,15 +146,28 @@ async def get_risk_stats(
     db: AsyncSession = Depends(get_db),
 ):
     """Get aggregate risk statistics"""
-    query = select(LoginEvent)
-    if wallet_address:
-        query = query.where(LoginEvent.wallet_address == wallet_address.lower())
-
-    result = await db.execute(query)
-    events = result.scalars().all()
+    # Counted in SQL — no need to load every login row to tally it
+    filters = [LoginEvent.wallet_address == wallet_address.lower()] if wallet_address else []
+    latest_score = (
+        select(LoginEvent.risk_score).where(*filters)
+        .order_by(desc(LoginEvent.timestamp)).limit(1)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            func.count(),
+            func.avg(LoginEvent.risk_score),
+            func.count().filter(LoginEvent.risk_level == "high"),
+            func.count().filter(LoginEvent.risk_level == "medium"),
+            func.count().filter(LoginEvent.risk_level == "low"),
+            func.count().filter(LoginEvent.step_up_required == True),
+            latest_score,
+        ).where(*filters)
+    )
+    total, avg_score, high, medium, low, step_ups, latest = result.one()
 
-    if not events:
-        return {
+    if not total:
+        return UTCJSONResponse({
             "total_logins": 0,
             "avg_risk_score": 0,
             "high_risk_count": 0,
@@ -146,18 +175,20 @@ async def get_risk_stats(
             "low_risk_count": 0,
             "step_up_triggered": 0,
             "unique_countries": [],
-        }
-
-    scores = [e.risk_score for e in events]
-    countries = list(set(e.geo_country for e in events if e.geo_country))
-
-    return {
-        "total_logins": len(events),
-        "avg_risk_score": round(sum(scores) / len(scores), 4),
-        "high_risk_count": sum(1 for e in events if e.risk_level == "high"),
-        "medium_risk_count": sum(1 for e in events if e.risk_level == "medium"),
-        "low_risk_count": sum(1 for e in events if e.risk_level == "low"),
-        "step_up_triggered": sum(1 for e in events if e.step_up_required),
-        "unique_countries": countries,
-        "latest_score": scores[-1] if scores else 0,
-    }
+        })
+
+    countries = await db.execute(
+        select(LoginEvent.geo_country).distinct()
+        .where(*filters, LoginEvent.geo_country.is_not(None), LoginEvent.geo_country != "")
+    )
+
+    return UTCJSONResponse({
+        "total_logins": total,
+        "avg_risk_score": round(avg_score or 0, 4),
+        "high_risk_count": high,
+        "medium_risk_count": medium,
+        "low_risk_count": low,
+        "step_up_triggered": step_ups,
+        "unique_countries": countries.scalars().all(),
+        "latest_score": latest or 0,
+    })
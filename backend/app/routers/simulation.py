@@ -3,23 +3,24 @@ SentinelX Simulation Router
 Live attack simulation for demo mode
 """
 import hashlib
-import json
 import random
-import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+import orjson
+from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.models import LoginEvent, GuardEvent, TransactionEvent
-from app.services.risk_engine import RiskEngine
+from app.models.models import LoginEvent, GuardEvent, TransactionEvent, generate_uuid
+from app.services.risk_engine import HistoryEntry, RiskEngine
 from app.services.guard_layer import GuardLayer
 from app.services.transaction_risk import TransactionRiskEngine
 from app.services.merkle import MerkleBatcher
 from app.services.enforcement import SecurityEnforcement
+from app.services.response_cache import ResponseCache
 
 router = APIRouter()
 
@@ -39,6 +40,9 @@ NORMAL_IPS = [
     {"ip": "192.168.1.100", "country": "United States", "city": "New York", "lat": 40.7128, "lng": -74.0060},
 ]
 
+# The simulated IPs are fixed, so their stored hashes are too
+IP_HASHES = {info["ip"]: hashlib.sha256(info["ip"].encode()).hexdigest() for info in SUSPICIOUS_IPS + NORMAL_IPS}
+
 SENSITIVE_TEXTS = [
     "My credit card number is 4532015112830366 and the CVV is 123",
     "Password: SuperSecret123! for admin@company.com",
@@ -65,6 +69,21 @@ WALLETS = [
 ]
 
 
+# Static scenario catalogue, encoded once at import
+SCENARIOS_BODY = orjson.dumps({
+    "scenarios": [
+        {"id": "suspicious_login", "name": "Suspicious Login", "description": "Login from a suspicious IP with unusual device fingerprint"},
+        {"id": "normal_login", "name": "Normal Login", "description": "Standard login from a known IP"},
+        {"id": "data_leak", "name": "Data Leak Attempt", "description": "User tries to send sensitive data (credit card, SSN, etc.)"},
+        {"id": "clean_text", "name": "Clean Text", "description": "Normal text that passes GuardLayer checks"},
+        {"id": "burst_attack", "name": "Burst Attack", "description": "Rapid-fire login attempts simulating a brute force attack"},
+        {"id": "risky_transaction", "name": "Risky Transaction", "description": "High-value ETH transfer to unknown wallet with urgency language"},
+        {"id": "safe_transaction", "name": "Safe Transaction", "description": "Normal ETH transfer to known recipient"},
+        {"id": "full_demo", "name": "Full Demo", "description": "Complete scenario: normal login -> suspicious login -> data leak -> risky transaction -> burst attack"},
+    ]
+})
+
+
 class SimulationRequest(BaseModel):
     scenario: str  # suspicious_login, normal_login, data_leak, clean_text, burst_attack, risky_transaction, safe_transaction, full_demo
     wallet_address: Optional[str] = None
@@ -101,6 +120,8 @@ async def run_simulation(req: SimulationRequest, db: AsyncSession = Depends(get_
     # Trigger enforcement pipeline after simulation events
     enforcer = SecurityEnforcement.get_instance()
     enforcement = await enforcer.evaluate_and_enforce(db, wallet)
+    # Scenarios write for random counterparties too, so drop every dashboard view
+    ResponseCache.get_instance().invalidate_all()
 
     return {
         "scenario": req.scenario,
@@ -114,34 +135,31 @@ async def run_simulation(req: SimulationRequest, db: AsyncSession = Depends(get_
 @router.get("/scenarios")
 async def list_scenarios():
     """List available simulation scenarios"""
-    return {
-        "scenarios": [
-            {"id": "suspicious_login", "name": "Suspicious Login", "description": "Login from a suspicious IP with unusual device fingerprint"},
-            {"id": "normal_login", "name": "Normal Login", "description": "Standard login from a known IP"},
-            {"id": "data_leak", "name": "Data Leak Attempt", "description": "User tries to send sensitive data (credit card, SSN, etc.)"},
-            {"id": "clean_text", "name": "Clean Text", "description": "Normal text that passes GuardLayer checks"},
-            {"id": "burst_attack", "name": "Burst Attack", "description": "Rapid-fire login attempts simulating a brute force attack"},
-            {"id": "risky_transaction", "name": "Risky Transaction", "description": "High-value ETH transfer to unknown wallet with urgency language"},
-            {"id": "safe_transaction", "name": "Safe Transaction", "description": "Normal ETH transfer to known recipient"},
-            {"id": "full_demo", "name": "Full Demo", "description": "Complete scenario: normal login -> suspicious login -> data leak -> risky transaction -> burst attack"},
-        ]
-    }
+    return Response(SCENARIOS_BODY, media_type="application/json")
 
 
 # ─── Simulation Implementations ─────────────────────────────────────
 
+def _event_hash(*fields) -> str:
+    """SHA-256 over fixed-order "|"-joined fields — the login event preimage, minus a JSON encode"""
+    return hashlib.sha256("|".join(map(str, fields)).encode()).hexdigest()
+
+
 async def _simulate_suspicious_login(wallet: str, count: int, db: AsyncSession):
     results = []
+    rows = []
+    wallet_lc = wallet.lower()
+    now_iso = datetime.utcnow().isoformat()  # hash preimages only; rows read their own clock
     risk_engine = RiskEngine.get_instance()
     batcher = MerkleBatcher.get_instance()
+    # One history read for the whole run; each attempt is scored in memory
+    history = await risk_engine.get_history(db, wallet_lc)
 
     for i in range(min(count, 10)):
         ip_info = random.choice(SUSPICIOUS_IPS)
 
-        risk_score, risk_level, explanation = await risk_engine.score(
-            db=db,
-            wallet_address=wallet,
-            ip_address=ip_info["ip"],
+        risk_score, risk_level, explanation = risk_engine.score_history(
+            history,
             user_agent="Mozilla/5.0 (Linux; Android 4.4) AppleWebKit/537.36 UnknownBot/1.0",
             geo_country=ip_info["country"],
             current_hour=random.choice([1, 2, 3, 4, 23]),
@@ -150,33 +168,30 @@ async def _simulate_suspicious_login(wallet: str, count: int, db: AsyncSession):
         risk_score = max(risk_score, 0.7)
         risk_level = "high"
 
-        event_data = json.dumps({
-            "wallet": wallet.lower(), "ip": ip_info["ip"],
-            "risk_score": risk_score, "sim": True,
-            "timestamp": datetime.utcnow().isoformat(),
-        }, sort_keys=True)
-        event_hash = hashlib.sha256(event_data.encode()).hexdigest()
+        event_hash = _event_hash(wallet_lc, ip_info["ip"], risk_score, "sim", i, now_iso)
 
         features = {f["feature"]: f["value"] for f in explanation.get("factors", [])}
 
-        login_event = LoginEvent(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet.lower(),
-            ip_address=ip_info["ip"],
-            ip_hash=hashlib.sha256(ip_info["ip"].encode()).hexdigest(),
-            user_agent="UnknownBot/1.0",
-            geo_lat=ip_info["lat"],
-            geo_lng=ip_info["lng"],
-            geo_country=ip_info["country"],
-            geo_city=ip_info["city"],
-            risk_score=risk_score,
-            risk_level=risk_level,
-            risk_features=features,
-            step_up_required=True,
-            event_hash=event_hash,
-            timestamp=datetime.utcnow() - timedelta(minutes=random.randint(0, 60)),
-        )
-        db.add(login_event)
+        row = {
+            "id": generate_uuid(),
+            "wallet_address": wallet_lc,
+            "ip_address": ip_info["ip"],
+            "ip_hash": IP_HASHES[ip_info["ip"]],
+            "user_agent": "UnknownBot/1.0",
+            "geo_lat": ip_info["lat"],
+            "geo_lng": ip_info["lng"],
+            "geo_country": ip_info["country"],
+            "geo_city": ip_info["city"],
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "risk_features": features,
+            "step_up_required": True,
+            "event_hash": event_hash,
+            "timestamp": datetime.utcnow() - timedelta(minutes=random.randint(0, 60)),
+        }
+        rows.append(row)
+        # Later attempts see this one, as the per-attempt history query did
+        history.insert(0, HistoryEntry(row["user_agent"], row["geo_country"], row["timestamp"]))
         batcher.add_event(event_hash, "login_sim", {"country": ip_info["country"]})
 
         results.append({
@@ -191,51 +206,53 @@ async def _simulate_suspicious_login(wallet: str, count: int, db: AsyncSession):
             "explanation": explanation,
         })
 
+    if rows:
+        await db.execute(insert(LoginEvent), rows)  # one executemany, no ORM objects
     await db.commit()
     return results
 
 
 async def _simulate_normal_login(wallet: str, count: int, db: AsyncSession):
     results = []
+    rows = []
+    wallet_lc = wallet.lower()
+    now_iso = datetime.utcnow().isoformat()
     risk_engine = RiskEngine.get_instance()
     batcher = MerkleBatcher.get_instance()
+    # One history read for the whole run; each attempt is scored in memory
+    history = await risk_engine.get_history(db, wallet_lc)
 
     for i in range(min(count, 10)):
         ip_info = random.choice(NORMAL_IPS)
 
-        risk_score, risk_level, explanation = await risk_engine.score(
-            db=db,
-            wallet_address=wallet,
-            ip_address=ip_info["ip"],
+        risk_score, risk_level, explanation = risk_engine.score_history(
+            history,
             user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Chrome/120.0",
             geo_country=ip_info["country"],
             current_hour=random.choice([9, 10, 11, 14, 15, 16]),
         )
 
-        event_data = json.dumps({
-            "wallet": wallet.lower(), "ip": ip_info["ip"],
-            "risk_score": risk_score, "sim": True,
-            "timestamp": datetime.utcnow().isoformat(),
-        }, sort_keys=True)
-        event_hash = hashlib.sha256(event_data.encode()).hexdigest()
-
-        login_event = LoginEvent(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet.lower(),
-            ip_address=ip_info["ip"],
-            ip_hash=hashlib.sha256(ip_info["ip"].encode()).hexdigest(),
-            user_agent="Chrome/120.0",
-            geo_lat=ip_info["lat"],
-            geo_lng=ip_info["lng"],
-            geo_country=ip_info["country"],
-            geo_city=ip_info["city"],
-            risk_score=risk_score,
-            risk_level=risk_level,
-            risk_features={f["feature"]: f["value"] for f in explanation.get("factors", [])},
-            event_hash=event_hash,
-            timestamp=datetime.utcnow() - timedelta(minutes=random.randint(0, 120)),
-        )
-        db.add(login_event)
+        event_hash = _event_hash(wallet_lc, ip_info["ip"], risk_score, "sim", i, now_iso)
+
+        row = {
+            "id": generate_uuid(),
+            "wallet_address": wallet_lc,
+            "ip_address": ip_info["ip"],
+            "ip_hash": IP_HASHES[ip_info["ip"]],
+            "user_agent": "Chrome/120.0",
+            "geo_lat": ip_info["lat"],
+            "geo_lng": ip_info["lng"],
+            "geo_country": ip_info["country"],
+            "geo_city": ip_info["city"],
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "risk_features": {f["feature"]: f["value"] for f in explanation.get("factors", [])},
+            "event_hash": event_hash,
+            "timestamp": datetime.utcnow() - timedelta(minutes=random.randint(0, 120)),
+        }
+        rows.append(row)
+        # Later attempts see this one, as the per-attempt history query did
+        history.insert(0, HistoryEntry(row["user_agent"], row["geo_country"], row["timestamp"]))
         batcher.add_event(event_hash, "login_sim")
 
         results.append({
@@ -247,31 +264,35 @@ async def _simulate_normal_login(wallet: str, count: int, db: AsyncSession):
             "event_hash": event_hash,
         })
 
+    if rows:
+        await db.execute(insert(LoginEvent), rows)  # one executemany, no ORM objects
     await db.commit()
     return results
 
 
 async def _simulate_data_leak(wallet: str, count: int, db: AsyncSession):
     results = []
-    guard = GuardLayer()
+    rows = []
+    wallet_lc = wallet.lower()
+    guard = GuardLayer.get_instance()
     batcher = MerkleBatcher.get_instance()
 
     for i in range(min(count, len(SENSITIVE_TEXTS))):
         text = SENSITIVE_TEXTS[i % len(SENSITIVE_TEXTS)]
         scan_result = await guard.scan(text, use_llm=False)  # Regex only for speed
 
-        guard_event = GuardEvent(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet.lower(),
-            content_hash=scan_result["content_hash"],
-            scan_type="regex",
-            risk_detected=scan_result["is_risky"],
-            risk_categories=scan_result["categories"],
-            user_override=random.choice([True, False]),
-            event_hash=scan_result["event_hash"],
-            timestamp=datetime.utcnow() - timedelta(minutes=random.randint(0, 60)),
-        )
-        db.add(guard_event)
+        row = {
+            "id": generate_uuid(),
+            "wallet_address": wallet_lc,
+            "content_hash": scan_result["content_hash"],
+            "scan_type": "regex",
+            "risk_detected": scan_result["is_risky"],
+            "risk_categories": scan_result["categories"],
+            "user_override": random.choice([True, False]),
+            "event_hash": scan_result["event_hash"],
+            "timestamp": datetime.utcnow() - timedelta(minutes=random.randint(0, 60)),
+        }
+        rows.append(row)
         batcher.add_event(scan_result["event_hash"], "guard_sim")
 
         results.append({
@@ -283,13 +304,15 @@ async def _simulate_data_leak(wallet: str, count: int, db: AsyncSession):
             "event_hash": scan_result["event_hash"],
         })
 
+    if rows:
+        await db.execute(insert(GuardEvent), rows)  # one executemany, no ORM objects
     await db.commit()
     return results
 
 
 async def _simulate_clean_text(wallet: str, count: int, db: AsyncSession):
     results = []
-    guard = GuardLayer()
+    guard = GuardLayer.get_instance()
 
     for i in range(min(count, len(CLEAN_TEXTS))):
         text = CLEAN_TEXTS[i % len(CLEAN_TEXTS)]
@@ -308,16 +331,19 @@ async def _simulate_clean_text(wallet: str, count: int, db: AsyncSession):
 async def _simulate_burst_attack(wallet: str, db: AsyncSession):
     """Simulate rapid-fire login burst (brute force attempt)"""
     results = []
+    rows = []
+    wallet_lc = wallet.lower()
+    now_iso = datetime.utcnow().isoformat()
     risk_engine = RiskEngine.get_instance()
     batcher = MerkleBatcher.get_instance()
+    # One history read for the whole run; each attempt is scored in memory
+    history = await risk_engine.get_history(db, wallet_lc)
 
     for i in range(8):
         ip_info = random.choice(SUSPICIOUS_IPS)
 
-        risk_score, risk_level, explanation = await risk_engine.score(
-            db=db,
-            wallet_address=wallet,
-            ip_address=ip_info["ip"],
+        risk_score, risk_level, explanation = risk_engine.score_history(
+            history,
             user_agent=f"Bot-Scanner/{random.randint(1,99)}",
             geo_country=ip_info["country"],
             current_hour=3,
@@ -326,30 +352,28 @@ async def _simulate_burst_attack(wallet: str, db: AsyncSession):
         risk_score = max(risk_score, 0.75)
         risk_level = "high"
 
-        event_data = json.dumps({
-            "wallet": wallet.lower(), "burst": i,
-            "timestamp": datetime.utcnow().isoformat(),
-        }, sort_keys=True)
-        event_hash = hashlib.sha256(event_data.encode()).hexdigest()
-
-        login_event = LoginEvent(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet.lower(),
-            ip_address=ip_info["ip"],
-            ip_hash=hashlib.sha256(ip_info["ip"].encode()).hexdigest(),
-            user_agent=f"Bot-Scanner/{random.randint(1,99)}",
-            geo_lat=ip_info["lat"],
-            geo_lng=ip_info["lng"],
-            geo_country=ip_info["country"],
-            geo_city=ip_info["city"],
-            risk_score=risk_score,
-            risk_level=risk_level,
-            risk_features={f["feature"]: f["value"] for f in explanation.get("factors", [])},
-            step_up_required=True,
-            event_hash=event_hash,
-            timestamp=datetime.utcnow() - timedelta(seconds=i * 3),
-        )
-        db.add(login_event)
+        event_hash = _event_hash(wallet_lc, "burst", i, now_iso)
+
+        row = {
+            "id": generate_uuid(),
+            "wallet_address": wallet_lc,
+            "ip_address": ip_info["ip"],
+            "ip_hash": IP_HASHES[ip_info["ip"]],
+            "user_agent": f"Bot-Scanner/{random.randint(1,99)}",
+            "geo_lat": ip_info["lat"],
+            "geo_lng": ip_info["lng"],
+            "geo_country": ip_info["country"],
+            "geo_city": ip_info["city"],
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "risk_features": {f["feature"]: f["value"] for f in explanation.get("factors", [])},
+            "step_up_required": True,
+            "event_hash": event_hash,
+            "timestamp": datetime.utcnow() - timedelta(seconds=i * 3),
+        }
+        rows.append(row)
+        # Later attempts see this one, as the per-attempt history query did
+        history.insert(0, HistoryEntry(row["user_agent"], row["geo_country"], row["timestamp"]))
         batcher.add_event(event_hash, "burst_sim")
 
         results.append({
@@ -360,6 +384,8 @@ async def _simulate_burst_attack(wallet: str, db: AsyncSession):
             "country": ip_info["country"],
         })
 
+    if rows:
+        await db.execute(insert(LoginEvent), rows)  # one executemany, no ORM objects
     await db.commit()
     return results
 
@@ -415,6 +441,8 @@ async def _simulate_full_demo(wallet: str, db: AsyncSession):
 async def _simulate_risky_transaction(wallet: str, count: int, db: AsyncSession):
     """Simulate high-risk ETH transfers."""
     results = []
+    wallet_lc = wallet.lower()
+    now_iso = datetime.utcnow().isoformat()
     tx_engine = TransactionRiskEngine.get_instance()
     batcher = MerkleBatcher.get_instance()
 
@@ -440,13 +468,13 @@ async def _simulate_risky_transaction(wallet: str, count: int, db: AsyncSession)
         if risk_score >= 0.6:
             risk_level = "high"
 
-        event_hash = explanation.get("event_hash", hashlib.sha256(
-            json.dumps({"sim_tx": i, "ts": datetime.utcnow().isoformat()}, sort_keys=True).encode()
-        ).hexdigest())
+        event_hash = explanation.get("event_hash") or hashlib.sha256(
+            orjson.dumps({"sim_tx": i, "ts": now_iso}, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
 
         tx_event = TransactionEvent(
-            id=str(uuid.uuid4()),
-            sender_wallet=wallet.lower(),
+            id=generate_uuid(),
+            sender_wallet=wallet_lc,
             recipient_wallet=scenario["recipient"].lower(),
             amount_eth=scenario["amount"],
             risk_score=risk_score,
@@ -479,6 +507,8 @@ async def _simulate_risky_transaction(wallet: str, count: int, db: AsyncSession)
 async def _simulate_safe_transaction(wallet: str, count: int, db: AsyncSession):
     """Simulate normal, safe ETH transfers."""
     results = []
+    wallet_lc = wallet.lower()
+    now_iso = datetime.utcnow().isoformat()
     tx_engine = TransactionRiskEngine.get_instance()
     batcher = MerkleBatcher.get_instance()
 
@@ -498,13 +528,13 @@ async def _simulate_safe_transaction(wallet: str, count: int, db: AsyncSession):
             chat_context=scenario["context"],
         )
 
-        event_hash = explanation.get("event_hash", hashlib.sha256(
-            json.dumps({"sim_safe_tx": i, "ts": datetime.utcnow().isoformat()}, sort_keys=True).encode()
-        ).hexdigest())
+        event_hash = explanation.get("event_hash") or hashlib.sha256(
+            orjson.dumps({"sim_safe_tx": i, "ts": now_iso}, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
 
         tx_event = TransactionEvent(
-            id=str(uuid.uuid4()),
-            sender_wallet=wallet.lower(),
+            id=generate_uuid(),
+            sender_wallet=wallet_lc,
             recipient_wallet=scenario["recipient"].lower(),
             amount_eth=scenario["amount"],
             risk_score=risk_score,
@@ -2,20 +2,22 @@
 SentinelX Transaction Router
 AI-protected ETH transfer evaluation, logging, and history.
 """
-import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, desc, func, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.models import TransactionEvent
+from app.models.models import TransactionEvent, generate_uuid
+from app.pagination import encode_cursor, decode_cursor, before_cursor
+from app.responses import UTCJSONResponse
 from app.services.transaction_risk import TransactionRiskEngine, COOLDOWN_MINUTES
 from app.services.merkle import MerkleBatcher
 from app.services.enforcement import SecurityEnforcement
+from app.services.response_cache import ResponseCache
 
 router = APIRouter()
 
@@ -73,7 +75,7 @@ async def evaluate_transaction(
 
     # Create transaction event record
     event = TransactionEvent(
-        id=str(uuid.uuid4()),
+        id=generate_uuid(),
         sender_wallet=req.sender_wallet.lower(),
         recipient_wallet=req.recipient_wallet.lower(),
         amount_eth=req.amount_eth,
@@ -97,6 +99,7 @@ async def evaluate_transaction(
 
     db.add(event)
     await db.commit()
+    ResponseCache.get_instance().invalidate(event.sender_wallet, event.recipient_wallet)
 
     # Add to Merkle audit trail
     batcher = MerkleBatcher.get_instance()
@@ -149,6 +152,7 @@ async def confirm_transaction(
     if req.step_up_completed:
         event.step_up_completed = True
     await db.commit()
+    ResponseCache.get_instance().invalidate(event.sender_wallet, event.recipient_wallet)
 
     return {
         "transaction_id": event.id,
@@ -159,26 +163,45 @@ async def confirm_transaction(
 
 # ─── Transaction History ──────────────────────────────────────────────
 
+# Only the serialized columns — plain rows, no ORM hydration
+HISTORY_COLUMNS = (
+    TransactionEvent.id, TransactionEvent.sender_wallet, TransactionEvent.recipient_wallet,
+    TransactionEvent.amount_eth, TransactionEvent.risk_score, TransactionEvent.risk_level,
+    TransactionEvent.status, TransactionEvent.tx_hash, TransactionEvent.step_up_required,
+    TransactionEvent.step_up_completed, TransactionEvent.event_hash, TransactionEvent.created_at,
+)
+
+
 @router.get("/history")
 async def get_transaction_history(
     wallet: str,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get transaction history for a wallet (sent + received)."""
+    """Get transaction history for a wallet (sent + received); next_cursor pages further back."""
     w = wallet.lower()
+    # Each side walks its own (wallet, created_at) index and stops after `limit`
+    # rows, so merging two short lists replaces sorting everything the OR matched
+    sent = select(*HISTORY_COLUMNS).where(TransactionEvent.sender_wallet == w)
+    received = select(*HISTORY_COLUMNS).where(
+        TransactionEvent.recipient_wallet == w,
+        TransactionEvent.sender_wallet != w,  # self-sends already come from `sent`
+    )
+    after = decode_cursor(cursor)
+    if after:
+        before = before_cursor(TransactionEvent.created_at, TransactionEvent.id, after)
+        sent, received = sent.where(before), received.where(before)
+    merged = union_all(*(
+        select(side.order_by(desc(TransactionEvent.created_at), desc(TransactionEvent.id)).limit(limit).subquery())
+        for side in (sent, received)
+    )).subquery()
     result = await db.execute(
-        select(TransactionEvent)
-        .where(
-            (TransactionEvent.sender_wallet == w) |
-            (TransactionEvent.recipient_wallet == w)
-        )
-        .order_by(desc(TransactionEvent.created_at))
-        .limit(limit)
+        select(merged).order_by(desc(merged.c.created_at), desc(merged.c.id)).limit(limit)
     )
-    events = result.scalars().all()
+    events = result.all()
 
-    return {
+    return UTCJSONResponse({
         "transactions": [
             {
                 "id": e.id,
@@ -192,12 +215,13 @@ async def get_transaction_history(
                 "step_up_required": e.step_up_required,
                 "step_up_completed": e.step_up_completed,
                 "event_hash": e.event_hash,
-                "timestamp": e.created_at.isoformat() + "Z" if e.created_at else None,
+                "timestamp": e.created_at,
             }
             for e in events
         ],
         "count": len(events),
-    }
+        "next_cursor": encode_cursor(events[-1].created_at, events[-1].id) if len(events) == limit else None,
+    })
 
 
 # ─── Transaction Stats ───────────────────────────────────────────────
@@ -210,46 +234,22 @@ async def get_transaction_stats(
     """Get aggregated transaction statistics for a wallet."""
     w = wallet.lower()
 
-    # Total sent
-    sent_result = await db.execute(
-        select(func.count(), func.coalesce(func.sum(TransactionEvent.amount_eth), 0)).where(
-            TransactionEvent.sender_wallet == w
-        )
-    )
-    sent_row = sent_result.one()
-    total_sent_count = sent_row[0]
-    total_sent_eth = float(sent_row[1])
-
-    # Blocked
-    blocked_result = await db.execute(
-        select(func.count()).select_from(TransactionEvent).where(
-            TransactionEvent.sender_wallet == w,
-            TransactionEvent.status == "blocked",
-        )
-    )
-    blocked_count = blocked_result.scalar() or 0
-
-    # Step-ups
-    stepup_result = await db.execute(
-        select(func.count()).select_from(TransactionEvent).where(
-            TransactionEvent.sender_wallet == w,
-            TransactionEvent.step_up_required == True,
-        )
-    )
-    stepup_count = stepup_result.scalar() or 0
-
-    # Avg risk
-    avg_result = await db.execute(
-        select(func.avg(TransactionEvent.risk_score)).where(
-            TransactionEvent.sender_wallet == w
-        )
+    # Every figure from one scan of the sender's rows, as conditional aggregates
+    result = await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(TransactionEvent.amount_eth), 0),
+            func.count().filter(TransactionEvent.status == "blocked"),
+            func.count().filter(TransactionEvent.step_up_required == True),
+            func.avg(TransactionEvent.risk_score),
+        ).where(TransactionEvent.sender_wallet == w)
     )
-    avg_risk = round(float(avg_result.scalar() or 0), 4)
+    total_sent_count, total_sent_eth, blocked_count, stepup_count, avg_risk = result.one()
 
-    return {
+    return UTCJSONResponse({
         "total_transactions": total_sent_count,
-        "total_eth_sent": round(total_sent_eth, 6),
+        "total_eth_sent": round(float(total_sent_eth), 6),
         "blocked_count": blocked_count,
         "step_up_count": stepup_count,
-        "avg_risk_score": avg_risk,
-    }
+        "avg_risk_score": round(float(avg_risk or 0), 4),
+    })
@@ -8,6 +8,7 @@ Trust Score Bands:
   <50     → restricted/locked (sensitive actions disabled, cooldown applied)
 """
 from datetime import datetime, timedelta
+from itertools import chain, repeat
 from typing import Optional, Tuple
 
 from sqlalchemy import select, desc
@@ -23,6 +24,54 @@ TRUST_STEP_UP_THRESHOLD = 50      # 50-79 → step_up_required
 # <50 → restricted / locked
 LOCKOUT_COOLDOWN_MINUTES = 1      # how long a "locked" session lasts (1 min for demo)
 
+# ── Trust score weights ───────────────────────────────────────────────
+# Recency decays 1.5% per newer event, floored at 0.5 from the 34th on
+RECENCY_WEIGHTS = tuple(1.0 - i * 0.015 for i in range(34))
+LOGIN_LEVEL_PENALTY = {"high": 10, "medium": 4}
+
+
+def _recency():
+    return chain(RECENCY_WEIGHTS, repeat(0.5))
+
+
+def compute_trust_score(login_events, guard_events, tx_events) -> int:
+    """
+    Unified Trust Score (0-100) from the newest-first login, guard and
+    transaction rows. Higher = more trusted.
+    """
+    score = 100.0
+
+    # Login penalties (max 40) — use actual risk scores with recency decay
+    if login_events:
+        login_penalty = 0.0
+        for e, recency in zip(login_events, _recency()):
+            weight = LOGIN_LEVEL_PENALTY.get(e.risk_level)
+            if weight:
+                login_penalty += weight * (e.risk_score or 0.5) * recency
+        score -= min(40, login_penalty)
+
+    # Guard penalties (max 30) — with recency decay
+    if guard_events:
+        guard_penalty = 0.0
+        for e, recency in zip(guard_events, _recency()):
+            if e.risk_detected:
+                guard_penalty += 5 * recency
+            if e.user_override:
+                guard_penalty += 2 * recency
+        score -= min(30, guard_penalty)
+
+    # Transaction penalties (max 30) — use actual risk scores with recency
+    if tx_events:
+        tx_penalty = 0.0
+        for e, recency in zip(tx_events, _recency()):
+            if e.status == "blocked":
+                tx_penalty += 12 * (e.risk_score or 0.5) * recency
+            elif e.cooldown_until is not None:
+                tx_penalty += 6 * (e.risk_score or 0.5) * recency
+        score -= min(30, tx_penalty)
+
+    return max(0, round(score))
+
 
 class SecurityEnforcement:
     """Singleton security enforcement engine."""
@@ -47,11 +96,13 @@ class SecurityEnforcement:
         """
         w = wallet_address.lower()
 
-        # 1. Gather recent risk events
+        # 1. Gather recent risk events (login columns are covered by
+        #    ix_login_events_wallet_ts, so this is an index-only scan)
         login_events = (await db.execute(
-            select(LoginEvent).where(LoginEvent.wallet_address == w)
+            select(LoginEvent.risk_score, LoginEvent.risk_level, LoginEvent.timestamp)
+            .where(LoginEvent.wallet_address == w)
             .order_by(desc(LoginEvent.timestamp)).limit(100)
-        )).scalars().all()
+        )).all()
 
         guard_events = (await db.execute(
             select(GuardEvent).where(GuardEvent.wallet_address == w)
@@ -66,7 +117,7 @@ class SecurityEnforcement:
         )).scalars().all()
 
         # 2. Compute trust score
-        trust_score = self._compute_trust_score(login_events, guard_events, tx_events)
+        trust_score = compute_trust_score(login_events, guard_events, tx_events)
 
         # 2b. Add persisted step-up bonus (survives re-evaluation)
         existing = await db.execute(
@@ -241,46 +292,6 @@ class SecurityEnforcement:
         return True, ""
 
     # ── Private helpers ───────────────────────────────────────────────
-    def _compute_trust_score(self, login_events, guard_events, tx_events) -> int:
-        score = 100.0
-
-        # Login penalties (max 40) — use actual risk scores with recency decay
-        if login_events:
-            login_penalty = 0.0
-            for i, e in enumerate(login_events):
-                recency = max(0.5, 1.0 - i * 0.015)
-                severity = e.risk_score if e.risk_score else 0.5
-                if e.risk_level == "high":
-                    login_penalty += 10 * severity * recency
-                elif e.risk_level == "medium":
-                    login_penalty += 4 * severity * recency
-            score -= min(40, login_penalty)
-
-        # Guard penalties (max 30) — with recency decay
-        if guard_events:
-            guard_penalty = 0.0
-            for i, e in enumerate(guard_events):
-                recency = max(0.5, 1.0 - i * 0.015)
-                if e.risk_detected:
-                    guard_penalty += 5 * recency
-                if e.user_override:
-                    guard_penalty += 2 * recency
-            score -= min(30, guard_penalty)
-
-        # Transaction penalties (max 30) — use actual risk scores with recency
-        if tx_events:
-            tx_penalty = 0.0
-            for i, e in enumerate(tx_events):
-                recency = max(0.5, 1.0 - i * 0.015)
-                severity = e.risk_score if e.risk_score else 0.5
-                if e.status == "blocked":
-                    tx_penalty += 12 * severity * recency
-                elif e.cooldown_until is not None:
-                    tx_penalty += 6 * severity * recency
-            score -= min(30, tx_penalty)
-
-        return max(0, round(score))
-
     def _determine_status(
         self, trust_score: int, login_events, tx_events, now: datetime,
     ) -> Tuple[str, Optional[str], Optional[datetime]]:
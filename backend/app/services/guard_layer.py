@@ -18,6 +18,13 @@ try:
 except ImportError:
     HAS_OPENAI = False
 
+# Optional Hyperscan prefilter — one multi-pattern DFA pass per message
+try:
+    import hyperscan
+    HAS_HYPERSCAN = True
+except ImportError:
+    HAS_HYPERSCAN = False
+
 
 # ─── Risk Scoring Constants (from pattern.md) ────────────────────────
 SCORE_HIGH_CRITICAL = 80
@@ -26,6 +33,9 @@ SCORE_CONTEXTUAL = 25
 THRESHOLD_BLOCK = 70
 THRESHOLD_WARN = 40
 
+# Bumped whenever the event-hash preimage layout changes
+EVENT_HASH_VERSION = b"\x01"
+
 # False positive keywords — reduce risk score if present
 FALSE_POSITIVE_PATTERN = re.compile(
     r"\b(example|dummy|test data|sample|placeholder|mock|fake|lorem)\b", re.IGNORECASE
@@ -227,7 +237,12 @@ Text to redact:
 {text}
 ---"""
 
+    _instance = None
+
     def __init__(self):
+        # Compiled once per process — the hot path never goes through re's cache lookup
+        self.compiled: Dict[str, re.Pattern] = {p: re.compile(p) for p in _scan_patterns()}
+        self.prefilter = _get_prefilter()
         self.openai_client = None
         if HAS_OPENAI and settings.OPENROUTER_API_KEY:
             try:
@@ -238,8 +253,26 @@ Text to redact:
             except Exception:
                 pass
 
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
     # ─── Regex Scanning (comprehensive fallback) ─────────────────────
 
+    def _candidates(self, text: str) -> Optional[set]:
+        """
+        Patterns that may match text, per the Hyperscan prefilter.
+        None means no prefilter is available — run every pattern.
+        """
+        if self.prefilter is None:
+            return None
+        db, patterns = self.prefilter
+        found = set()
+        db.scan(text.encode(), match_event_handler=_on_prefilter_match, context=found)
+        return {patterns[i] for i in found}
+
     def scan_regex(self, text: str) -> Tuple[List[Dict], int]:
         """
         Comprehensive regex scan with cumulative risk scoring.
@@ -251,9 +284,14 @@ Text to redact:
         # Check false positive indicators first
         has_false_positive = bool(FALSE_POSITIVE_PATTERN.search(text))
 
+        # Skip re.findall for patterns the prefilter has ruled out
+        candidates = self._candidates(text)
+
         # Category 1: High-Critical (+80 each)
         for key, config in self.HIGH_CRITICAL_PATTERNS.items():
-            matches = re.findall(config["pattern"], text)
+            if candidates is not None and config["pattern"] not in candidates:
+                continue
+            matches = self.compiled[config["pattern"]].findall(text)
             if matches:
                 findings.append({
                     "type": key,
@@ -268,7 +306,9 @@ Text to redact:
 
         # Category 2: Sensitive (+50 each)
         for key, config in self.SENSITIVE_PATTERNS.items():
-            matches = re.findall(config["pattern"], text)
+            if candidates is not None and config["pattern"] not in candidates:
+                continue
+            matches = self.compiled[config["pattern"]].findall(text)
             if matches:
                 findings.append({
                     "type": key,
@@ -283,7 +323,9 @@ Text to redact:
 
         # Category 3: Contextual (+25 each)
         for key, config in self.CONTEXTUAL_PATTERNS.items():
-            matches = re.findall(config["pattern"], text)
+            if candidates is not None and config["pattern"] not in candidates:
+                continue
+            matches = self.compiled[config["pattern"]].findall(text)
             if matches:
                 findings.append({
                     "type": key,
@@ -299,7 +341,8 @@ Text to redact:
         # Combined escalation rules (multiply risk for dangerous combos)
         for rule in ESCALATION_RULES:
             all_matched = all(
-                re.search(p, text) for p in rule["patterns"]
+                (candidates is None or p in candidates) and self.compiled[p].search(text)
+                for p in rule["patterns"]
             )
             if all_matched:
                 escalation_bonus = 30
@@ -380,6 +423,21 @@ Text to redact:
                 "llm_available": False,
             }
 
+    @staticmethod
+    def event_hash(content_hash: str, is_risky: bool, categories: List[str]) -> str:
+        """
+        Audit event hash over the content hash and verdict (never raw content).
+        Fixed-order NUL-joined fields behind a version byte — no JSON encoding.
+        """
+        event_data = b"\x00".join((
+            EVENT_HASH_VERSION,
+            content_hash.encode(),
+            b"1" if is_risky else b"0",
+            ",".join(sorted(set(categories))).encode(),
+            datetime.utcnow().isoformat().encode(),
+        ))
+        return hashlib.sha256(event_data).hexdigest()
+
     async def scan(self, text: str, use_llm: bool = True) -> Dict:
         """
         Full dual-layer scan.
@@ -420,13 +478,7 @@ Text to redact:
         content_hash = hashlib.sha256(text.encode()).hexdigest()
 
         # Generate event hash for audit
-        event_data = json.dumps({
-            "content_hash": content_hash,
-            "timestamp": datetime.utcnow().isoformat(),
-            "is_risky": is_risky,
-            "categories": list(set(categories)),
-        }, sort_keys=True)
-        event_hash = hashlib.sha256(event_data.encode()).hexdigest()
+        event_hash = self.event_hash(content_hash, is_risky, categories)
 
         return {
             "is_risky": is_risky,
@@ -448,17 +500,27 @@ Text to redact:
         Redact sensitive data from text.
         Uses regex first (deterministic, preserves surrounding text),
         falls back to LLM only if regex didn't redact anything but scan flagged risk.
+        Also reports the categories it redacted, so callers don't need to rescan.
         """
         original_hash = hashlib.sha256(text.encode()).hexdigest()
 
         # Primary: regex-based redaction — precise, only replaces matched patterns
         redacted_text = text
+        categories = []
+        severity = "low"
         for key, config in self.HIGH_CRITICAL_PATTERNS.items():
             label = key.upper()
-            redacted_text = re.sub(config["pattern"], f"[REDACTED-{label}]", redacted_text)
+            redacted_text, count = self.compiled[config["pattern"]].subn(f"[REDACTED-{label}]", redacted_text)
+            if count:
+                categories.append(key)
+                severity = "critical"
         for key, config in self.SENSITIVE_PATTERNS.items():
             label = key.upper()
-            redacted_text = re.sub(config["pattern"], f"[REDACTED-{label}]", redacted_text)
+            redacted_text, count = self.compiled[config["pattern"]].subn(f"[REDACTED-{label}]", redacted_text)
+            if count:
+                categories.append(key)
+                if severity == "low":
+                    severity = "high"
 
         # If regex caught something, use it — it preserves surrounding text
         if redacted_text != text:
@@ -466,6 +528,8 @@ Text to redact:
                 "original_hash": original_hash,
                 "redacted_text": redacted_text,
                 "method": "regex",
+                "categories": categories,
+                "severity": severity,
             }
 
         # Fallback: LLM redaction for patterns regex might miss
@@ -487,6 +551,8 @@ Text to redact:
                         "original_hash": original_hash,
                         "redacted_text": llm_redacted,
                         "method": "llm",
+                        "categories": ["llm_redaction"],
+                        "severity": "high",
                     }
             except Exception:
                 pass
@@ -496,4 +562,54 @@ Text to redact:
             "original_hash": original_hash,
             "redacted_text": redacted_text,
             "method": "regex",
+            "categories": categories,
+            "severity": severity,
         }
+
+
+# ─── Hyperscan Prefilter ─────────────────────────────────────────────
+
+_prefilter = None
+
+
+def _on_prefilter_match(pattern_id, start, end, flags, found):
+    found.add(pattern_id)
+
+
+def _scan_patterns() -> List[str]:
+    """Every distinct pattern scan_regex may run, in category order"""
+    patterns = [
+        config["pattern"]
+        for group in (GuardLayer.HIGH_CRITICAL_PATTERNS, GuardLayer.SENSITIVE_PATTERNS, GuardLayer.CONTEXTUAL_PATTERNS)
+        for config in group.values()
+    ]
+    patterns += [p for rule in ESCALATION_RULES for p in rule["patterns"]]
+    return list(dict.fromkeys(patterns))
+
+
+def _get_prefilter() -> Optional[Tuple[object, List[str]]]:
+    """
+    Compile every scan pattern into one Hyperscan database, once per process.
+    PREFILTER mode guarantees a superset of re's matches (constructs such as
+    lookbehind are approximated), and UTF8|UCP keeps \\w, \\d and \\s Unicode-aware
+    like re's. Returns (database, patterns by id), or None to scan with re alone.
+    """
+    global _prefilter
+    if _prefilter is not None or not HAS_HYPERSCAN:
+        return _prefilter
+
+    patterns = _scan_patterns()
+    flags = hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[flags] * len(patterns),
+        )
+    except Exception:
+        return None
+
+    _prefilter = (db, patterns)
+    return _prefilter
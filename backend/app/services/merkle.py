@@ -11,42 +11,48 @@ from typing import Dict, List, Optional, Tuple
 
 from app.config import settings
 
+MERKLE_BATCH_SIZE = settings.MERKLE_BATCH_SIZE
+MERKLE_BATCH_INTERVAL_SECONDS = settings.MERKLE_BATCH_INTERVAL_SECONDS
 
-def keccak256(data: bytes) -> str:
-    """Compute keccak256 hash (fallback to sha3_256 if pysha3 not available)"""
-    try:
-        import sha3
-        h = sha3.keccak_256()
-        h.update(data)
-        return "0x" + h.hexdigest()
-    except ImportError:
-        h = hashlib.sha256(data)
-        return "0x" + h.hexdigest()
+# Resolve the keccak backend once — not on every hash
+try:
+    import sha3
+    HAS_SHA3 = True
+except ImportError:
+    HAS_SHA3 = False
+
+
+def keccak256(data: bytes) -> bytes:
+    """Raw 32-byte keccak256 digest (fallback to sha256 if pysha3 not available)"""
+    if HAS_SHA3:
+        return sha3.keccak_256(data).digest()
+    return hashlib.sha256(data).digest()
 
 
 class MerkleTree:
     """Standard Merkle tree with keccak256 hashing"""
 
     def __init__(self, leaves: List[str]):
-        self.leaves = [self._to_bytes32(leaf) for leaf in leaves]
-        self.layers: List[List[str]] = []
+        # Nodes are raw 32-byte digests; hex only appears at the API edges
+        self.leaves: List[bytes] = [self._to_bytes32(leaf) for leaf in leaves]
+        self.layers: List[List[bytes]] = []
         self.root: str = ""
         self._build()
 
-    def _to_bytes32(self, hex_str: str) -> str:
-        """Normalize a hex string to bytes32"""
+    @staticmethod
+    def _to_bytes32(hex_str: str) -> bytes:
+        """Normalize a hex string to a raw bytes32 digest"""
         if hex_str.startswith("0x"):
             hex_str = hex_str[2:]
-        return hex_str.ljust(64, "0")[:64]
+        return bytes.fromhex(hex_str.ljust(64, "0")[:64])
 
-    def _hash_pair(self, a: str, b: str) -> str:
+    @staticmethod
+    def _hash_pair(a: bytes, b: bytes) -> bytes:
         """Hash two nodes together (sorted for consistency)"""
-        pair = sorted([a, b])
-        combined = bytes.fromhex(pair[0]) + bytes.fromhex(pair[1])
-        return keccak256(combined)[2:]  # strip 0x
+        return keccak256(a + b if a <= b else b + a)
 
     def _build(self):
-        """Build the Merkle tree from leaves up"""
+        """Build the Merkle tree from leaves up, one whole layer at a time"""
         if not self.leaves:
             self.root = "0x" + "0" * 64
             return
@@ -64,7 +70,7 @@ class MerkleTree:
             current_layer = next_layer
             self.layers.append(current_layer[:])
 
-        self.root = "0x" + current_layer[0]
+        self.root = "0x" + current_layer[0].hex()
 
     def get_proof(self, leaf_index: int) -> List[str]:
         """Get Merkle proof for a specific leaf"""
@@ -78,23 +84,24 @@ class MerkleTree:
             if index % 2 == 0:
                 # Right sibling
                 if index + 1 < len(layer):
-                    proof.append("0x" + layer[index + 1])
+                    proof.append("0x" + layer[index + 1].hex())
             else:
                 # Left sibling
-                proof.append("0x" + layer[index - 1])
+                proof.append("0x" + layer[index - 1].hex())
             index = index // 2
 
         return proof
 
     def verify_proof(self, leaf: str, proof: List[str], root: str) -> bool:
         """Verify a Merkle proof"""
-        current = self._to_bytes32(leaf)
-
-        for sibling in proof:
-            sibling_clean = self._to_bytes32(sibling)
-            current = self._hash_pair(current, sibling_clean)
+        try:
+            current = self._to_bytes32(leaf)
+            for sibling in proof:
+                current = self._hash_pair(current, self._to_bytes32(sibling))
+        except ValueError:
+            return False  # not hex
 
-        return ("0x" + current) == root
+        return ("0x" + current.hex()) == root
 
 
 class MerkleBatcher:
@@ -104,7 +111,12 @@ class MerkleBatcher:
 
     def __init__(self):
         self.pending_events: List[Dict] = []
+        # Roots of complete subtrees over the pending leaves; slot i spans 2**i leaves
+        self.frontier: List[Optional[bytes]] = []
         self.batches: List[Dict] = []
+        self.batches_by_root: Dict[str, Dict] = {}
+        self.total_events_batched = 0
+        # Full trees are only built when a proof is requested
         self.trees: Dict[str, MerkleTree] = {}
 
     @classmethod
@@ -114,7 +126,8 @@ class MerkleBatcher:
         return cls._instance
 
     def add_event(self, event_hash: str, event_type: str = "login", metadata: Optional[Dict] = None):
-        """Add an event hash to the pending batch"""
+        """Add an event hash to the pending batch — O(log n) hashes, no rebuild"""
+        self._append_leaf(MerkleTree._to_bytes32(event_hash))
         self.pending_events.append({
             "event_hash": event_hash,
             "event_type": event_type,
@@ -123,21 +136,46 @@ class MerkleBatcher:
         })
 
         # Auto-batch if threshold reached
-        if len(self.pending_events) >= settings.MERKLE_BATCH_SIZE:
+        if len(self.pending_events) >= MERKLE_BATCH_SIZE:
             return self.create_batch()
         return None
 
+    def _append_leaf(self, node: bytes):
+        """Carry the new leaf up the frontier like a binary counter increment"""
+        i = 0
+        while i < len(self.frontier) and self.frontier[i] is not None:
+            node = MerkleTree._hash_pair(self.frontier[i], node)
+            self.frontier[i] = None
+            i += 1
+        if i == len(self.frontier):
+            self.frontier.append(node)
+        else:
+            self.frontier[i] = node
+
+    def pending_root(self) -> str:
+        """
+        Root over the pending leaves, folded from the frontier on demand.
+        Matches MerkleTree, which promotes an unpaired node a layer up as-is.
+        """
+        root = None
+        for node in self.frontier:
+            if node is not None:
+                root = node if root is None else MerkleTree._hash_pair(node, root)
+        if root is None:
+            return "0x" + "0" * 64
+        return "0x" + root.hex()
+
     def create_batch(self) -> Optional[Dict]:
         """Create a Merkle batch from pending events"""
         if not self.pending_events:
             return None
 
         event_hashes = [e["event_hash"] for e in self.pending_events]
-        tree = MerkleTree(event_hashes)
+        merkle_root = self.pending_root()
 
         batch = {
             "id": f"batch_{len(self.batches) + 1}",
-            "merkle_root": tree.root,
+            "merkle_root": merkle_root,
             "event_count": len(event_hashes),
             "event_hashes": event_hashes,
             "events": self.pending_events[:],
@@ -146,9 +184,11 @@ class MerkleBatcher:
             "status": "pending",
         }
 
-        self.trees[tree.root] = tree
+        self.batches_by_root[merkle_root] = batch
         self.batches.append(batch)
+        self.total_events_batched += batch["event_count"]
         self.pending_events = []
+        self.frontier = []
 
         return batch
 
@@ -156,12 +196,14 @@ class MerkleBatcher:
         """Get Merkle proof for a specific event in a batch"""
         tree = self.trees.get(merkle_root)
         if not tree:
-            return None
+            batch = self.batches_by_root.get(merkle_root)
+            if not batch:
+                return None
+            tree = self.trees[merkle_root] = MerkleTree(batch["event_hashes"])
 
-        # Find the leaf index
-        normalized_hash = tree._to_bytes32(event_hash)
+        # Find the leaf index (ValueError covers both non-hex input and a missing leaf)
         try:
-            leaf_index = tree.leaves.index(normalized_hash)
+            leaf_index = tree.leaves.index(tree._to_bytes32(event_hash))
         except ValueError:
             return None
 
@@ -181,12 +223,19 @@ class MerkleBatcher:
         tree = MerkleTree([])  # Dummy tree for utility methods
         return tree.verify_proof(event_hash, proof, merkle_root)
 
-    def get_stats(self) -> Dict:
-        """Get batching statistics"""
+    def get_counts(self) -> Dict:
+        """Batching counters only — O(1), no root fold or batch listing"""
         return {
             "pending_events": len(self.pending_events),
             "total_batches": len(self.batches),
-            "total_events_batched": sum(b["event_count"] for b in self.batches),
+            "total_events_batched": self.total_events_batched,
+        }
+
+    def get_stats(self) -> Dict:
+        """Get batching statistics"""
+        return {
+            **self.get_counts(),
+            "pending_root": self.pending_root(),
             "batches": [
                 {
                     "id": b["id"],
@@ -204,7 +253,7 @@ class MerkleBatcher:
     async def run_background(self):
         """Background task: periodically create batches"""
         while True:
-            await asyncio.sleep(settings.MERKLE_BATCH_INTERVAL_SECONDS)
+            await asyncio.sleep(MERKLE_BATCH_INTERVAL_SECONDS)
             if self.pending_events:
                 batch = self.create_batch()
                 if batch:
@@ -0,0 +1,75 @@
+"""
+SentinelX Response Cache
+Short-lived cache of encoded dashboard responses, invalidated on writes
+"""
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Tuple
+
+from cachetools import TTLCache
+
+# Dashboard polling collapses to one build per (endpoint, wallet) per window
+RESPONSE_CACHE_TTL_SECONDS = 10
+
+# "" keys the all-wallets view, which every write makes stale
+ALL_WALLETS = ""
+
+
+class ResponseCache:
+    """
+    Caches (etag, body) per (endpoint, wallet).
+    Concurrent misses on a key share one build (single-flight), and writers call
+    invalidate(wallet) after committing so polls never outlive the data they show.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self.entries: TTLCache = TTLCache(maxsize=4096, ttl=RESPONSE_CACHE_TTL_SECONDS)
+        # A key's lock lives only while some request is holding or waiting on it
+        self.locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        # Bumped by every invalidation; a build that raced one is not stored
+        self.epoch = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def get_or_build(
+        self,
+        endpoint: str,
+        wallet: str,
+        build: Callable[[], Awaitable[Tuple[str, bytes]]],
+    ) -> Tuple[str, bytes]:
+        """Return the cached (etag, body), building it at most once across concurrent callers"""
+        key = (endpoint, wallet)
+        cached = self.entries.get(key)
+        if cached is not None:
+            return cached
+
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+
+        async with lock:
+            cached = self.entries.get(key)
+            if cached is None:
+                epoch = self.epoch
+                cached = await build()
+                if epoch == self.epoch:
+                    self.entries[key] = cached
+        return cached
+
+    def invalidate(self, *wallets: str) -> None:
+        """Drop cached responses for these wallets and the all-wallets view"""
+        self.epoch += 1
+        stale = {w.lower() for w in wallets if w} | {ALL_WALLETS}
+        for key in [k for k in self.entries if k[1] in stale]:
+            self.entries.pop(key, None)
+
+    def invalidate_all(self) -> None:
+        """Drop every cached response (writes that touch wallets we can't enumerate)"""
+        self.epoch += 1
+        self.entries.clear()
@@ -2,9 +2,8 @@
 SentinelX AI Risk Engine
 Weighted history-aware login risk scoring
 """
-import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -33,6 +32,16 @@ RAPID_COUNT_THRESHOLD = 3
 NORMAL_HOUR_START = 6
 NORMAL_HOUR_END = 22
 
+# Most recent logins considered per score
+HISTORY_LIMIT = 50
+
+
+class HistoryEntry(NamedTuple):
+    """The columns of a past login that the factor checks read"""
+    user_agent: Optional[str]
+    geo_country: Optional[str]
+    timestamp: Optional[datetime]
+
 
 class RiskEngine:
     """History-aware weighted login risk scoring"""
@@ -60,13 +69,24 @@ class RiskEngine:
         Compute risk score for a login attempt using wallet history.
         Returns (risk_score, risk_level, explanation).
         """
-        wallet = wallet_address.lower()
+        # Fetch recent login history for this wallet
+        history = await self.get_history(db, wallet_address.lower())
+        return self.score_history(history, user_agent, geo_country, current_hour)
+
+    def score_history(
+        self,
+        history: List[HistoryEntry],
+        user_agent: str = "",
+        geo_country: Optional[str] = None,
+        current_hour: Optional[int] = None,
+    ) -> Tuple[float, str, Dict]:
+        """
+        Score against an already-fetched history (newest first) — no DB access,
+        so callers scoring many attempts for one wallet fetch it once.
+        """
         if current_hour is None:
             current_hour = datetime.utcnow().hour
 
-        # Fetch recent login history for this wallet
-        history = await self._get_history(db, wallet)
-
         # Compute graduated factors (each 0.0 to 1.0)
         new_device = self._check_new_device(user_agent, history)
         new_country = self._check_new_country(geo_country, history)
@@ -105,16 +125,13 @@ class RiskEngine:
 
     # ─── Factor checks ───────────────────────────────────────────────
 
-    def _check_new_device(self, user_agent: str, history: List[LoginEvent]) -> float:
+    def _check_new_device(self, user_agent: str, history: List[HistoryEntry]) -> float:
         """Score based on device familiarity and device diversity."""
         if not user_agent or not history:
             return 1.0
-        ua_hash = hashlib.md5(user_agent.encode()).hexdigest()
-        known_devices = set()
-        for event in history:
-            if event.user_agent:
-                known_devices.add(hashlib.md5(event.user_agent.encode()).hexdigest())
-        if ua_hash in known_devices:
+        # Exact user-agent match (equivalent to comparing digests, without hashing each row)
+        known_devices = {e.user_agent for e in history if e.user_agent}
+        if user_agent in known_devices:
             return 0.0
         # New device: less alarming if user regularly uses multiple devices
         if len(known_devices) >= 5:
@@ -123,7 +140,7 @@ class RiskEngine:
             return 0.6
         return 1.0
 
-    def _check_new_country(self, geo_country: Optional[str], history: List[LoginEvent]) -> float:
+    def _check_new_country(self, geo_country: Optional[str], history: List[HistoryEntry]) -> float:
         """Score based on geographic familiarity."""
         if not geo_country:
             return 0.0
@@ -137,7 +154,7 @@ class RiskEngine:
             return 0.5
         return 1.0
 
-    def _check_rapid_attempts(self, history: List[LoginEvent]) -> float:
+    def _check_rapid_attempts(self, history: List[HistoryEntry]) -> float:
         """Graduated score based on login frequency in recent window."""
         if not history:
             return 0.0
@@ -171,15 +188,15 @@ class RiskEngine:
 
     # ─── History lookup ──────────────────────────────────────────────
 
-    async def _get_history(self, db: AsyncSession, wallet: str, limit: int = 50) -> List[LoginEvent]:
-        """Fetch recent login history for a wallet."""
+    async def get_history(self, db: AsyncSession, wallet: str, limit: int = HISTORY_LIMIT) -> List[HistoryEntry]:
+        """Fetch recent login history for a wallet (only the checked columns, no ORM rows)."""
         result = await db.execute(
-            select(LoginEvent)
+            select(LoginEvent.user_agent, LoginEvent.geo_country, LoginEvent.timestamp)
             .where(LoginEvent.wallet_address == wallet)
             .order_by(desc(LoginEvent.timestamp))
             .limit(limit)
         )
-        return list(result.scalars().all())
+        return [HistoryEntry._make(row) for row in result]
 
     # ─── Explanation ─────────────────────────────────────────────────
 
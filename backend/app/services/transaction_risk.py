@@ -3,11 +3,11 @@ SentinelX Transaction Risk Engine
 Behavioral financial firewall for in-chat ETH transfers.
 """
 import hashlib
-import json
 import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
+import orjson
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -108,12 +108,12 @@ class TransactionRiskEngine:
         explanation = self._explain(factors, risk_score, risk_level, display_score, in_cooldown)
 
         # Build event hash
-        event_data = json.dumps({
+        event_data = orjson.dumps({
             "sender": sender, "recipient": recipient,
             "amount": amount_eth, "risk_score": risk_score,
             "timestamp": datetime.utcnow().isoformat(),
-        }, sort_keys=True)
-        event_hash = hashlib.sha256(event_data.encode()).hexdigest()
+        }, option=orjson.OPT_SORT_KEYS)
+        event_hash = hashlib.sha256(event_data).hexdigest()
 
         explanation["event_hash"] = event_hash
         explanation["display_score"] = display_score
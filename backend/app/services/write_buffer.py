@@ -0,0 +1,115 @@
+"""
+SentinelX Write Buffer
+Coalesces inserts from concurrent requests into batched Core INSERTs
+"""
+import asyncio
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert
+
+from app.database import AsyncSessionLocal
+
+# Flush when this many rows are queued, or this long after the first one
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_DELAY_SECONDS = 0.05
+# Upper bound on how long add() waits for its batch, so a stalled writer
+# surfaces as an error in the handler instead of hanging it
+WRITE_TIMEOUT_SECONDS = 10
+
+
+class WriteBuffer:
+    """
+    Queues (model, values) rows and writes each batch with one executemany
+    INSERT per model — no ORM objects, unit-of-work or identity map.
+    Callers pass every column they need back (ids, timestamps) in values.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def add(self, model, values: Dict) -> None:
+        """Queue a row for model and wait until its batch has been committed"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((model, values, future))
+        await asyncio.wait_for(future, WRITE_TIMEOUT_SECONDS)
+
+    async def _collect(self, batch: List[Tuple[object, Dict, asyncio.Future]]):
+        """
+        Wait for one item, then gather more until the batch is full or the delay
+        passes. Fills the caller's list so a cancel mid-collect loses nothing.
+        """
+        loop = asyncio.get_running_loop()
+        batch.append(await self.queue.get())
+        deadline = loop.time() + WRITE_BATCH_DELAY_SECONDS
+        while len(batch) < WRITE_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _flush(self, batch: List[Tuple[object, Dict, asyncio.Future]]):
+        """Commit a batch; on failure retry row by row so one bad row can't sink the rest"""
+        rows_by_model: Dict[object, List[Dict]] = {}
+        for model, values, _ in batch:
+            rows_by_model.setdefault(model, []).append(values)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                for model, rows in rows_by_model.items():
+                    await db.execute(insert(model), rows)
+                await db.commit()
+        except Exception:
+            for model, values, future in batch:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(insert(model), [values])
+                        await db.commit()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+            return
+
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def run_background(self):
+        """
+        Background task: drain the queue in batches. On cancel (shutdown) the
+        in-flight flush is allowed to finish and everything still queued is
+        written before the cancellation propagates.
+        """
+        batch: List[Tuple[object, Dict, asyncio.Future]] = []
+        flush = None
+        try:
+            while True:
+                batch = []
+                await self._collect(batch)
+                flush = asyncio.ensure_future(self._flush(batch))
+                await asyncio.shield(flush)  # a cancel must not abandon a commit midway
+                flush = None
+        except asyncio.CancelledError:
+            if flush is not None:
+                await flush
+            elif batch:
+                await self._flush(batch)
+            while not self.queue.empty():
+                await self._flush([
+                    self.queue.get_nowait()
+                    for _ in range(min(self.queue.qsize(), WRITE_BATCH_SIZE))
+                ])
+            raise
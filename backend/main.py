@@ -8,9 +8,11 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import init_db, AsyncSessionLocal
+from app.database import init_db, reset_db, AsyncSessionLocal
+from app.responses import UTCJSONResponse
 from app.routers import auth, risk, guard, audit, simulation, dashboard, chat, transactions
 from app.services.merkle import MerkleBatcher
+from app.services.write_buffer import WriteBuffer
 from sqlalchemy import delete
 from app.models.models import Message
 
@@ -39,21 +41,31 @@ async def cleanup_expired_messages():
 async def lifespan(app: FastAPI):
     """Application startup / shutdown lifecycle"""
     # Startup
-    await init_db()
+    if settings.RESET_DB_ON_STARTUP:
+        await reset_db()
+    else:
+        await init_db()
     # Start Merkle batcher background task
     batcher = MerkleBatcher.get_instance()
     merkle_task = asyncio.create_task(batcher.run_background())
+    # Start batched DB writer (chat messages)
+    write_task = asyncio.create_task(WriteBuffer.get_instance().run_background())
     # Start expired message cleanup task
     cleanup_task = asyncio.create_task(cleanup_expired_messages())
     print("SentinelX Backend is running")
     yield
     # Shutdown
     merkle_task.cancel()
+    write_task.cancel()
     cleanup_task.cancel()
     try:
         await merkle_task
     except asyncio.CancelledError:
         pass
+    try:
+        await write_task
+    except asyncio.CancelledError:
+        pass
     try:
         await cleanup_task
     except asyncio.CancelledError:
@@ -65,6 +77,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="Web3 Adaptive Security Platform — AI-powered anomaly detection, LLM data guardrails, and on-chain audit trails.",
     lifespan=lifespan,
+    default_response_class=UTCJSONResponse,
 )
 
 # CORS — parse comma-separated FRONTEND_URL
@@ -0,0 +1,83 @@
+"""Keyset pagination must not drop rows that share the boundary timestamp"""
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(), "pagination.db")
+# Throwaway SQLite by default; point DATABASE_URL at a scratch Postgres to run there
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ["DEBUG"] = "false"
+
+import httpx
+
+from app.database import AsyncSessionLocal, engine, reset_db
+from app.models.models import GuardEvent, LoginEvent, TransactionEvent
+from main import app
+
+WALLET = "0x" + "ab" * 20
+OTHER = "0x" + "cd" * 20
+# Three distinct timestamps, four rows each — every page boundary lands on a tie
+TIMESTAMPS = [datetime(2026, 1, 1, 12, minute) for minute in (0, 5, 10)]
+
+
+class KeysetPaginationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        await reset_db()
+        async with AsyncSessionLocal() as db:
+            for ts in TIMESTAMPS:
+                for i in range(4):
+                    db.add(LoginEvent(wallet_address=WALLET, risk_score=0.5, timestamp=ts))
+                    db.add(GuardEvent(wallet_address=WALLET, content_hash=f"{i:064x}", timestamp=ts))
+                    # Half sent, half received, so both union branches hit the tie
+                    sender, recipient = (WALLET, OTHER) if i % 2 else (OTHER, WALLET)
+                    db.add(TransactionEvent(
+                        sender_wallet=sender, recipient_wallet=recipient, amount_eth=0.1, created_at=ts,
+                    ))
+            await db.commit()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await engine.dispose()
+
+    async def _page_all(self, path, params, key, limit):
+        seen, cursor = [], None
+        while True:
+            page = dict(params, limit=limit)
+            if cursor:
+                page["cursor"] = cursor
+            r = await self.client.get(path, params=page)
+            self.assertEqual(r.status_code, 200, r.text)
+            body = r.json()
+            seen.extend(body[key])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return seen
+
+    async def test_guard_events_pages_through_ties(self):
+        for limit in (1, 3, 5):
+            events = await self._page_all("/guard/events", {"wallet_address": WALLET}, "events", limit)
+            ids = [e["id"] for e in events]
+            self.assertEqual(len(ids), 12, f"limit={limit}")
+            self.assertEqual(len(set(ids)), 12, f"limit={limit}")
+
+    async def test_transaction_history_pages_through_ties(self):
+        for limit in (1, 3, 5):
+            txs = await self._page_all("/transactions/history", {"wallet": WALLET}, "transactions", limit)
+            ids = [t["id"] for t in txs]
+            self.assertEqual(len(ids), 12, f"limit={limit}")
+            self.assertEqual(len(set(ids)), 12, f"limit={limit}")
+
+    async def test_risk_timeline_pages_through_ties(self):
+        for limit in (1, 3, 5):
+            timeline = await self._page_all("/risk/timeline", {"wallet_address": WALLET}, "timeline", limit)
+            self.assertEqual(len(timeline), 12, f"limit={limit}")
+
+    async def test_malformed_cursor_is_rejected(self):
+        r = await self.client.get("/risk/timeline", params={"cursor": "not-a-cursor"})
+        self.assertEqual(r.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Wallet columns must be stored lowercase — the (wallet, ts) indexes rely on it"""
+import os
+import tempfile
+import unittest
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(), "constraints.db")
+# Throwaway SQLite by default; point DATABASE_URL at a scratch Postgres to run there
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy.exc import IntegrityError
+
+from app.database import AsyncSessionLocal, engine, reset_db
+from app.models.models import GuardEvent, LoginEvent, TransactionEvent
+
+LOWER = "0x" + "ab" * 20
+MIXED = "0x" + "AB" * 20
+
+
+class WalletLowercaseConstraintTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        await reset_db()
+
+    async def asyncTearDown(self):
+        await engine.dispose()
+
+    async def _insert(self, row):
+        async with AsyncSessionLocal() as db:
+            db.add(row)
+            await db.commit()
+
+    async def test_lowercase_rows_are_accepted(self):
+        await self._insert(LoginEvent(wallet_address=LOWER))
+        await self._insert(GuardEvent(wallet_address=LOWER, content_hash="00" * 32))
+        await self._insert(TransactionEvent(sender_wallet=LOWER, recipient_wallet=LOWER, amount_eth=1.0))
+
+    async def test_mixed_case_rows_are_rejected(self):
+        rows = [
+            LoginEvent(wallet_address=MIXED),
+            GuardEvent(wallet_address=MIXED, content_hash="00" * 32),
+            TransactionEvent(sender_wallet=MIXED, recipient_wallet=LOWER, amount_eth=1.0),
+            TransactionEvent(sender_wallet=LOWER, recipient_wallet=MIXED, amount_eth=1.0),
+        ]
+        for row in rows:
+            with self.subTest(table=row.__tablename__):
+                with self.assertRaises(IntegrityError):
+                    await self._insert(row)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+One-off in-place upgrade for databases created by an older build.
+
+init_db() only runs create_all, which creates missing tables but skips existing
+ones outright, along with their indexes; it never alters column types either.
+Run this once before starting the new build against an existing database:
+
+    python upgrade_db.py
+
+Every step checks the live schema first, so re-running it is a no-op. All steps
+share one transaction: a row that can't be converted rolls everything back.
+Column conversions and CHECK constraints are Postgres-only: SQLite accepts bytes
+in the old columns, but can't add a constraint to an existing table, so SQLite
+databases get the lowercase-wallet checks only when created fresh.
+"""
+import asyncio
+import re
+
+from sqlalchemy import CheckConstraint, func, select, text
+
+from app.database import engine
+from app.models.models import Base, HexDigest, PackedDigests
+
+
+async def column_type(conn, table: str, column: str):
+    result = await conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c"
+        ),
+        {"t": table, "c": column},
+    )
+    return result.scalar()
+
+
+async def hex_digests_to_bytea(conn):
+    """VARCHAR hex digests (optionally 0x-prefixed) → 32-byte bytea"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, HexDigest):
+                continue
+            if await column_type(conn, table.name, column.name) not in ("character varying", "text"):
+                continue
+            await conn.execute(text(
+                f"ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE bytea "
+                f"USING decode(regexp_replace({column.name}, '^0x', ''), 'hex')"
+            ))
+            print(f"  {table.name}.{column.name}: hex text → bytea")
+
+
+async def digest_lists_to_packed(conn):
+    """JSON arrays of hex digests → one bytea of concatenated 32-byte digests"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, PackedDigests):
+                continue
+            if await column_type(conn, table.name, column.name) not in ("json", "jsonb"):
+                continue
+            # USING can't hold the per-row array unnest, so go via a scratch column
+            packed = f"{column.name}_packed"
+            await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {packed} bytea"))
+            await conn.execute(text(
+                f"UPDATE {table.name} SET {packed} = ("
+                f"SELECT decode(coalesce(string_agg(regexp_replace(h, '^0x', ''), '' ORDER BY i), ''), 'hex') "
+                f"FROM json_array_elements_text({column.name}::json) WITH ORDINALITY AS t(h, i)"
+                f") WHERE json_typeof({column.name}::json) = 'array'"
+            ))
+            await conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN {column.name}"))
+            await conn.execute(text(f"ALTER TABLE {table.name} RENAME COLUMN {packed} TO {column.name}"))
+            print(f"  {table.name}.{column.name}: JSON hex list → packed bytea")
+
+
+async def drop_superseded_indexes(conn):
+    """Indexes since replaced under a new name"""
+    for name in ("ix_transaction_events_sender_created",):
+        await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+async def add_wallet_lower_checks(conn):
+    """Lowercase stored wallets, then add each missing ck_*_wallet*_lower constraint"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        for constraint in table.constraints:
+            if not isinstance(constraint, CheckConstraint):
+                continue
+            exists = await conn.execute(
+                text("SELECT 1 FROM pg_constraint WHERE conname = :n"), {"n": constraint.name}
+            )
+            if exists.scalar():
+                continue
+            condition = str(constraint.sqltext)
+            for column in re.findall(r"(\w+) = lower\(\1\)", condition):
+                result = await conn.execute(text(
+                    f"UPDATE {table.name} SET {column} = lower({column}) WHERE {column} <> lower({column})"
+                ))
+                if result.rowcount:
+                    print(f"  {table.name}.{column}: lowercased {result.rowcount} rows")
+            await conn.execute(text(
+                f"ALTER TABLE {table.name} ADD CONSTRAINT {constraint.name} CHECK ({condition})"
+            ))
+            print(f"  {table.name}: added {constraint.name}")
+
+
+async def dedupe_conversation_participants(conn):
+    """
+    Older builds let a wallet open a conversation with itself, storing two
+    identical (conversation_id, wallet_address) rows. Keep one per pair so the
+    unique participants index can be built; such conversations end up with a
+    single participant row.
+    """
+    result = await conn.execute(text(
+        "DELETE FROM conversation_participants WHERE id NOT IN ("
+        "SELECT min(id) FROM conversation_participants GROUP BY conversation_id, wallet_address)"
+    ))
+    if result.rowcount:
+        print(f"  conversation_participants: removed {result.rowcount} duplicate rows")
+
+
+async def create_missing_indexes(conn):
+    """
+    Every index declared on the models that the live database lacks, by name.
+    Plain indexes go first. A unique index whose columns already hold
+    duplicates is skipped with a warning instead of failing the transaction.
+    """
+    def create(sync_conn):
+        indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+        for index in sorted(indexes, key=lambda index: index.unique):
+            if index.unique and _has_duplicates(sync_conn, index):
+                print(f"  SKIPPED unique {index.name}: existing rows repeat {[c.name for c in index.columns]}")
+                continue
+            index.create(sync_conn, checkfirst=True)
+
+    await conn.run_sync(create)
+
+
+def _has_duplicates(sync_conn, index) -> bool:
+    columns = list(index.columns)
+    duplicate = sync_conn.execute(
+        select(*columns).group_by(*columns).having(func.count() > 1).limit(1)
+    ).first()
+    return duplicate is not None
+
+
+STEPS = [
+    hex_digests_to_bytea,
+    digest_lists_to_packed,
+    add_wallet_lower_checks,
+    drop_superseded_indexes,
+    dedupe_conversation_participants,  # before the unique index on those rows
+    create_missing_indexes,
+]
+
+
+async def main():
+    async with engine.begin() as conn:
+        for step in STEPS:
+            await step(conn)
+    await engine.dispose()
+    print("Schema upgrade complete")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
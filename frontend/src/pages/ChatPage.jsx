@@ -67,10 +67,11 @@ export default function ChatPage() {
         handleWsMessage(data);
       };
 
-      ws.onclose = () => {
+      ws.onclose = (event) => {
         setWsStatus('disconnected');
         if (ws._heartbeat) clearInterval(ws._heartbeat);
-        if (alive) {
+        // 4000: this wallet connected from another tab — don't fight it for the slot
+        if (alive && event.code !== 4000) {
           reconnectTimer = setTimeout(connect, 3000);
         }
       };